@@ -1,38 +1,63 @@
 # IT Admin Agent API
 # FastAPI application for troubleshooting IT infrastructure issues
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 import os
-import json
+import asyncio
+import functools
+import hashlib
 import logging
-from datetime import datetime
-
-from azure.identity import DefaultAzureCredential
-from openai import AzureOpenAI
-
-from tools import (
-    get_system_config,
-    get_system_metrics,
-    get_recent_logs,
-    get_service_health,
-    get_recent_changes,
-    check_dependencies,
-    get_resource_details,
-    TOOL_DEFINITIONS
-)
+import uuid
+import httpx
+import orjson
+from collections import OrderedDict
+from aiolimiter import AsyncLimiter
+from cachetools import LRUCache, TLRUCache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from openai import AsyncAzureOpenAI
+
+from tools import TOOL_DEFINITIONS, TOOL_FUNCTIONS
+from semantic_cache import SemanticCache, normalize
+from conversation_store import create_conversation_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the semantic cache on startup; on shutdown persist it and close
+    the process-wide clients."""
+    if SEMANTIC_CACHE_PATH and os.path.exists(SEMANTIC_CACHE_PATH):
+        try:
+            semantic_cache.load(SEMANTIC_CACHE_PATH)
+        except Exception as e:
+            logger.warning(f"Could not load semantic cache: {e}")
+    yield
+    if SEMANTIC_CACHE_PATH:
+        try:
+            semantic_cache.save(SEMANTIC_CACHE_PATH)
+        except Exception as e:
+            logger.warning(f"Could not save semantic cache: {e}")
+    await close_openai_client()
+    await conversation_store.close()
+    credential.close()
+
+
 # FastAPI app
 app = FastAPI(
     title="IT Admin Agent API",
     description="AI-powered troubleshooting agent for IT administrators",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -48,24 +73,114 @@ app.add_middleware(
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
 AI_PROJECT_ENDPOINT = os.getenv("AI_PROJECT_ENDPOINT", "")
+# 2024-10-01-preview or later is needed for prompt caching (cached_tokens in usage)
+AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21")
+# Semantic cache is enabled when an embedding deployment is configured
+AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "")  # .npz file
+# Cached responses reflect the (mock) environment when they were generated
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+COMPLETION_CACHE_SIZE = int(os.getenv("COMPLETION_CACHE_SIZE", "256"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "256"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "64"))
+# Estimated token budget for the history sent with each model call; 0 sends all of it
+MAX_HISTORY_TOKENS = int(os.getenv("MAX_HISTORY_TOKENS", "32000"))
+# Timeouts in seconds: per model call, per tool call and per /chat request
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "10"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "120"))
+# Chat completion throttling, sized from the deployment's RPM/TPM quota.
+# OPENAI_RPM=0 disables the request rate limit.
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "16"))
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "0"))
+
+# Credential is created once per process. Local dev and Container Apps
+# only need environment, workload/managed identity and CLI credentials, so
+# skip the slower developer-tool probes.
+credential = DefaultAzureCredential(
+    exclude_visual_studio_code_credential=True,
+    exclude_shared_token_cache_credential=True,
+    exclude_interactive_browser_credential=True
+)
+
+# The SDK calls the provider per request; it returns a cached token and only
+# refreshes it from Entra ID when it is close to expiry.
+token_provider = get_bearer_token_provider(
+    credential, "https://cognitiveservices.azure.com/.default"
+)
 
 # Azure OpenAI client (lazy initialized)
+# Async so that LLM round-trips don't block the event loop for other requests.
+# Initialization does not await, so it can't interleave and needs no lock.
 _openai_client = None
 
-def get_openai_client() -> AzureOpenAI:
+def get_openai_client() -> AsyncAzureOpenAI:
     """Get or create Azure OpenAI client with managed identity auth."""
     global _openai_client
     if _openai_client is None:
-        credential = DefaultAzureCredential()
-        token = credential.get_token("https://cognitiveservices.azure.com/.default")
-        _openai_client = AzureOpenAI(
+        # One pooled HTTP/2 client for all requests: concurrent completions are
+        # multiplexed over a few warm TLS connections instead of each paying
+        # its own handshake
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+            )
+        )
+        _openai_client = AsyncAzureOpenAI(
             azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            api_version="2024-06-01",
-            azure_ad_token=token.token
+            api_version=AZURE_OPENAI_API_VERSION,
+            azure_ad_token_provider=token_provider,
+            http_client=http_client
         )
     return _openai_client
 
+
+async def close_openai_client() -> None:
+    """Close the Azure OpenAI client and its HTTP connection pool."""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+# Throttle chat completions so bursts queue here instead of tripping Azure
+# OpenAI's rate limits and stalling in the SDK's retry backoff
+_openai_semaphore = asyncio.Semaphore(OPENAI_CONCURRENCY)
+_openai_rate_limiter = AsyncLimiter(OPENAI_RPM, 60) if OPENAI_RPM > 0 else None
+
+
+@asynccontextmanager
+async def openai_slot():
+    """Wait for a rate limit token and a concurrency slot for one model call."""
+    if _openai_rate_limiter is not None:
+        await _openai_rate_limiter.acquire()
+    async with _openai_semaphore:
+        yield
+
+# Embeddings by exact input text, so a retried prompt isn't embedded twice.
+# Stored as unit-length float32 arrays (~6 KB each for 1536 dimensions).
+_embedding_cache = LRUCache(maxsize=EMBEDDING_CACHE_SIZE)
+
+
+async def embed(text: str):
+    """Get a normalized embedding for text from the configured embedding deployment."""
+    embedding = _embedding_cache.get(text)
+    if embedding is None:
+        client = get_openai_client()
+        response = await client.embeddings.create(
+            model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
+            input=text
+        )
+        embedding = _embedding_cache[text] = normalize(response.data[0].embedding)
+    return embedding
+
 # System prompt for the IT Admin agent
+# The system prompt and tool definitions are identical for every request and
+# are sent first, so Azure OpenAI can serve them from its prompt cache. Caching
+# only applies once the shared prefix reaches 1024 tokens; the playbook below
+# keeps it above that. Keep this text static - no timestamps or per-request data.
 SYSTEM_PROMPT = """You are an expert IT Administrator troubleshooting agent. Your role is to help diagnose and resolve infrastructure issues.
 
 When a user reports a problem:
@@ -87,21 +202,277 @@ Available tools:
 Always be thorough in your investigation. Use multiple tools to build a complete picture.
 Explain your reasoning as you go. Cite specific data from tool outputs.
 
-If you cannot determine the root cause, suggest what additional information would help."""
-
-# Tool function mapping
-TOOL_FUNCTIONS = {
-    "get_system_config": get_system_config,
-    "get_system_metrics": get_system_metrics,
-    "get_recent_logs": get_recent_logs,
-    "get_service_health": get_service_health,
-    "get_recent_changes": get_recent_changes,
-    "check_dependencies": check_dependencies,
-    "get_resource_details": get_resource_details,
+If you cannot determine the root cause, suggest what additional information would help.
+
+Troubleshooting playbook:
+- Slow responses or timeouts: check get_system_metrics (cpu, memory, latency) for the affected resource, then check_dependencies and the metrics of each upstream dependency. A slow database or cache often shows up as latency in the services that call it.
+- Error spikes (5xx, failed requests): check get_recent_logs with severity "error", then get_recent_changes for deployments or configuration changes that line up with the start of the errors.
+- Connection failures to a managed Azure service: check get_service_health for that service and region before assuming a problem in the customer's configuration.
+- Resource exhaustion (high CPU, out-of-memory, connection pool exhausted): compare current usage with the configured SKU, replica counts and limits from get_system_config.
+- Unknown resource names: use get_resource_details to confirm the resource exists and to find its resource group, region and type.
+
+Response format:
+1. Summary - one or two sentences stating the most likely root cause.
+2. Evidence - the specific metrics, log entries, changes or incidents that support it, with their values and timestamps.
+3. Impact - which resources and downstream dependencies are affected.
+4. Remediation - ordered steps, starting with the lowest-risk mitigation. Call out any step that requires a deployment, restart or configuration change.
+5. Follow-up - what to monitor to confirm the fix, and what to check next if the issue persists.
+
+Never invent metric values, log entries or incident IDs. Only report data returned by the tools."""
+
+# Static prefix sent ahead of every conversation. It is never stored with the
+# history, so every request starts with byte-identical tokens and the
+# provider's prompt cache can reuse them across conversations and turns.
+PREFIX_MESSAGES = [{"role": "system", "content": SYSTEM_PROMPT}]
+
+
+def _estimate_tokens(message: dict) -> int:
+    """Rough token count of a chat message (~4 characters per token)."""
+    chars = len(message.get("content") or "")
+    for tc in message.get("tool_calls") or ():
+        chars += len(tc["function"]["name"]) + len(tc["function"]["arguments"])
+    return chars // 4 + 4  # plus per-message framing
+
+
+def history_window(history: List[dict]) -> List[dict]:
+    """The most recent turns of history that fit MAX_HISTORY_TOKENS.
+
+    Cuts only at user messages, so tool results always follow their calls,
+    and the current turn is always sent whole. Conversations under budget
+    are sent unchanged, keeping their prompt prefix cacheable.
+    """
+    if not MAX_HISTORY_TOKENS:
+        return history
+    total = 0
+    start = 0
+    for i in range(len(history) - 1, -1, -1):
+        total += _estimate_tokens(history[i])
+        if history[i]["role"] == "user":
+            if total > MAX_HISTORY_TOKENS and start:
+                break
+            start = i
+    return history[start:]
+
+
+# Thread pool for blocking tool functions, shared by all requests
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+# Tool result cache: identical (tool, arguments) calls within a tool's TTL
+# reuse the previous result, across turns and conversations. Volatile data
+# expires quickly, configuration much later; failures are never cached.
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "2048"))
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "60"))  # seconds
+TOOL_TTL = {
+    "get_system_metrics": 15,
+    "get_recent_logs": 15,
+    "get_service_health": 30,
+    "get_system_config": 300,
+    "get_resource_details": 300,
 }
 
+_tool_cache = TLRUCache(
+    maxsize=TOOL_CACHE_SIZE,
+    ttu=lambda key, result, now: now + TOOL_TTL.get(key[0], TOOL_CACHE_TTL)
+)
+
+
+async def run_tool(tool_name: str, arguments: Dict[str, Any]) -> Any:
+    """Run a tool in the thread pool, reusing a cached result when fresh."""
+    key = (tool_name, orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS))
+    result = _tool_cache.get(key)
+    if result is not None:
+        logger.info(f"Tool cache hit: {tool_name}")
+        return result
+
+    # A timed-out tool keeps its worker thread until it returns, but the
+    # request no longer waits for it
+    loop = asyncio.get_running_loop()
+    result = await asyncio.wait_for(
+        loop.run_in_executor(
+            TOOL_EXECUTOR, functools.partial(TOOL_FUNCTIONS[tool_name], **arguments)
+        ),
+        timeout=TOOL_TIMEOUT
+    )
+    _tool_cache[key] = result
+    return result
+
+
+async def execute_tool_call(tool_call: dict) -> tuple:
+    """Run a single model-requested tool call off the event loop.
+
+    Returns (arguments, result). Failures are reported in the result so the
+    model can see them instead of aborting the whole turn.
+    """
+    function_name = tool_call["function"]["name"]
+    try:
+        function_args = orjson.loads(tool_call["function"]["arguments"])
+    except orjson.JSONDecodeError as e:
+        return {}, {"error": f"Invalid arguments for {function_name}: {e}"}
+
+    logger.info(f"Calling tool: {function_name} with args: {function_args}")
+
+    if function_name not in TOOL_FUNCTIONS:
+        return function_args, {"error": f"Unknown tool: {function_name}"}
+
+    try:
+        result = await run_tool(function_name, function_args)
+    except asyncio.TimeoutError:
+        logger.warning(f"Tool {function_name} timed out after {TOOL_TIMEOUT}s")
+        result = {"error": "timeout"}
+    except Exception as e:
+        logger.warning(f"Tool {function_name} failed: {e}")
+        result = {"error": str(e)}
+    return function_args, result
+
+
+# Exact-match completion cache: identical (deployment, tools, messages) input
+# returns the previously generated assistant turn without calling the model
+_completion_cache: "OrderedDict[str, dict]" = OrderedDict()
+_COMPLETION_KEY_PREFIX = orjson.dumps([AZURE_OPENAI_DEPLOYMENT, TOOL_DEFINITIONS], option=orjson.OPT_SORT_KEYS)
+
+
+def _completion_cache_key(messages: List[dict], tool_choice: str) -> str:
+    h = hashlib.blake2b(_COMPLETION_KEY_PREFIX, digest_size=16)
+    h.update(tool_choice.encode())
+    h.update(orjson.dumps(messages, option=orjson.OPT_SORT_KEYS))
+    return h.hexdigest()
+
+
+def _cache_completion(key: str, turn: dict) -> None:
+    _completion_cache[key] = turn
+    if len(_completion_cache) > COMPLETION_CACHE_SIZE:
+        _completion_cache.popitem(last=False)
+
+
+def _cached_completion(key: str) -> Optional[dict]:
+    turn = _completion_cache.get(key)
+    if turn is not None:
+        _completion_cache.move_to_end(key)
+        logger.info("Completion cache hit")
+    return turn
+
+
+async def create_completion(messages: List[dict], tool_choice: str = "auto", use_cache: bool = True) -> dict:
+    """Get the next assistant turn for a conversation.
+
+    Returns a plain dict with content, tool_calls (in chat message format)
+    and finish_reason. Pass tool_choice="none" to force a text answer, and
+    use_cache=False to neither read nor fill the completion cache.
+    """
+    key = _completion_cache_key(messages, tool_choice)
+    turn = _cached_completion(key) if use_cache else None
+    if turn is not None:
+        return turn
+
+    client = get_openai_client()
+    async with openai_slot():
+        response = await asyncio.wait_for(
+            client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT,
+                messages=messages,
+                tools=TOOL_DEFINITIONS,
+                tool_choice=tool_choice
+            ),
+            timeout=OPENAI_TIMEOUT
+        )
+    usage = response.usage
+    if usage and usage.prompt_tokens_details:
+        logger.info(
+            f"Prompt tokens: {usage.prompt_tokens} "
+            f"(cached: {usage.prompt_tokens_details.cached_tokens})"
+        )
+
+    choice = response.choices[0]
+    turn = {
+        "content": choice.message.content,
+        "tool_calls": [
+            {
+                "id": tc.id,
+                "type": "function",
+                "function": {
+                    "name": tc.function.name,
+                    "arguments": tc.function.arguments
+                }
+            }
+            for tc in choice.message.tool_calls or []
+        ],
+        "finish_reason": choice.finish_reason
+    }
+    if use_cache:
+        _cache_completion(key, turn)
+    return turn
+
+
+async def stream_completion(messages: List[dict], tool_choice: str = "auto", use_cache: bool = True):
+    """Stream the next assistant turn for a conversation.
+
+    Yields content deltas as strings while the model generates, then the
+    complete turn dict (same shape as create_completion) as the last item.
+    """
+    key = _completion_cache_key(messages, tool_choice)
+    turn = _cached_completion(key) if use_cache else None
+    if turn is not None:
+        if turn["content"]:
+            yield turn["content"]
+        yield turn
+        return
+
+    client = get_openai_client()
+    # The slot is held until the stream finishes
+    async with openai_slot():
+        # Bounds the wait for the first chunk; the whole turn is bounded by
+        # REQUEST_TIMEOUT
+        stream = await asyncio.wait_for(
+            client.chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT,
+                messages=messages,
+                tools=TOOL_DEFINITIONS,
+                tool_choice=tool_choice,
+                stream=True
+            ),
+            timeout=OPENAI_TIMEOUT
+        )
+
+        content_parts = []
+        tool_calls = {}  # index -> tool call, assembled from argument fragments
+        finish_reason = None
+        async for chunk in stream:
+            # Azure sends content filter results in chunks without choices
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if delta.content:
+                content_parts.append(delta.content)
+                yield delta.content
+            for tc in delta.tool_calls or []:
+                call = tool_calls.setdefault(tc.index, {
+                    "id": "",
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if tc.id:
+                    call["id"] = tc.id
+                if tc.function and tc.function.name:
+                    call["function"]["name"] += tc.function.name
+                if tc.function and tc.function.arguments:
+                    call["function"]["arguments"] += tc.function.arguments
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+
+    turn = {
+        "content": "".join(content_parts) or None,
+        "tool_calls": [tool_calls[i] for i in sorted(tool_calls)],
+        "finish_reason": finish_reason
+    }
+    if use_cache:
+        _cache_completion(key, turn)
+    yield turn
+
 
 # Request/Response models
+# Every JSON endpoint declares a response model: FastAPI then serializes the
+# result straight to bytes in pydantic-core instead of via json.dumps
 class ChatMessage(BaseModel):
     role: str = Field(..., description="Role: 'user' or 'assistant'")
     content: str = Field(..., description="Message content")
@@ -110,6 +481,7 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="User's message describing the issue")
     conversation_id: Optional[str] = Field(None, description="Optional conversation ID for multi-turn")
     context: Optional[Dict[str, Any]] = Field(None, description="Optional context about the environment")
+    no_cache: bool = Field(False, description="Run the agent and model even if this or a similar prompt was answered before")
 
 class ToolCall(BaseModel):
     tool_name: str
@@ -129,150 +501,264 @@ class HealthResponse(BaseModel):
     project_configured: bool
 
 
-# In-memory conversation storage (use Cosmos DB in production)
-conversations: Dict[str, List[dict]] = {}
+class ToolInvocationResponse(BaseModel):
+    tool: str
+    arguments: Dict[str, Any]
+    result: Any
+
+
+class ConversationDeletedResponse(BaseModel):
+    status: str
+    conversation_id: str
+
+
+# Conversation history (in-memory, or Redis when REDIS_URL is set)
+conversation_store = create_conversation_store()
+
+# Responses for first-turn prompts, keyed by prompt embedding
+semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL)
+
+
+# Only the timestamp changes between probes
+_HEALTH_STATIC = {
+    "status": "healthy",
+    "openai_configured": bool(AZURE_OPENAI_ENDPOINT),
+    "project_configured": bool(AI_PROJECT_ENDPOINT)
+}
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    return HealthResponse(
-        status="healthy",
-        timestamp=datetime.utcnow().isoformat(),
-        openai_configured=bool(AZURE_OPENAI_ENDPOINT),
-        project_configured=bool(AI_PROJECT_ENDPOINT)
+    # Returned as a Response so FastAPI skips model validation per probe;
+    # response_model still documents the body. orjson formats the datetime
+    # itself, as ISO 8601 with a Z suffix.
+    return Response(
+        content=orjson.dumps(
+            {**_HEALTH_STATIC, "timestamp": datetime.now(timezone.utc)},
+            option=orjson.OPT_UTC_Z
+        ),
+        media_type="application/json"
     )
 
 
+# The tool list never changes at runtime, so serialize it once
+_TOOLS_RESPONSE = orjson.dumps({
+    "tools": TOOL_DEFINITIONS,
+    "description": "These tools are available for the IT Admin agent to gather information about systems."
+})
+
+
 @app.get("/tools")
 async def list_tools():
     """List available tools the agent can use."""
-    return {
-        "tools": TOOL_DEFINITIONS,
-        "description": "These tools are available for the IT Admin agent to gather information about systems."
-    }
+    return Response(content=_TOOLS_RESPONSE, media_type="application/json")
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def run_agent(request: ChatRequest, stream: bool = False):
+    """Run one user turn through the agent.
+
+    Yields progress events as dicts with a "type" key:
+    - "delta": generated text (only when stream=True)
+    - "tool_call": a tool the model asked for, before it runs
+    - "tool_result": the tool's arguments and result
+    - "done": the final ChatResponse, always the last event
     """
-    Send a message to the IT Admin agent.
+    # Get or create conversation
+    conversation_id = request.conversation_id or f"conv_{uuid.uuid4().hex}"
     
-    The agent will analyze the issue, call relevant tools to gather information,
-    and provide a diagnosis with remediation suggestions.
-    """
-    try:
-        # Get or create conversation
-        conversation_id = request.conversation_id or f"conv_{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+    # History is loaded once, updated locally and its new messages are
+    # appended to the store when the turn completes, so a failed turn leaves
+    # the stored history unchanged. History is append-only: never mutate or
+    # reorder a message once it has been added, or the cached prompt prefix
+    # is invalidated (and the stored copy would diverge).
+    # A freshly generated id has nothing stored yet, so new conversations
+    # skip the read and go straight to the cache lookup or model call.
+    if request.conversation_id:
+        history = await conversation_store.get(conversation_id) or []
+    else:
+        history = []
+    stored_count = len(history)
+    
+    # Only first turns are cacheable; follow-ups depend on the history
+    is_first_turn = not history
+    
+    # Add user message, with context if provided
+    user_content = request.message
+    if request.context:
+        context_json = orjson.dumps(request.context, option=orjson.OPT_INDENT_2).decode()
+        user_content += f"\n\nEnvironment context: {context_json}"
+    history.append({
+        "role": "user",
+        "content": user_content
+    })
+    
+    cache_embedding = None
+    if AZURE_OPENAI_EMBEDDING_DEPLOYMENT and is_first_turn and not request.no_cache:
+        try:
+            cache_embedding = await embed(request.message + orjson.dumps(request.context or {}).decode())
+            cached = semantic_cache.lookup(cache_embedding)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup skipped: {e}")
+            cache_embedding = cached = None
+        
+        if cached:
+            history.append({
+                "role": "assistant",
+                "content": cached["response"]
+            })
+            await conversation_store.append(conversation_id, history[stored_count:])
+            if stream:
+                yield {"type": "delta", "content": cached["response"]}
+            yield {"type": "done", "response": ChatResponse(**{**cached, "conversation_id": conversation_id})}
+            return
+    
+    tool_calls_made = []
+    
+    # Agentic loop - keep calling until no more tool calls
+    max_iterations = 10
+    iteration = 0
+    
+    while iteration < max_iterations:
+        iteration += 1
         
-        if conversation_id not in conversations:
-            conversations[conversation_id] = [
-                {"role": "system", "content": SYSTEM_PROMPT}
-            ]
+        # The last allowed round must answer instead of calling more tools
+        tool_choice = "none" if iteration == max_iterations else "auto"
+        if stream:
+            async for item in stream_completion(PREFIX_MESSAGES + history_window(history), tool_choice, not request.no_cache):
+                if isinstance(item, str):
+                    yield {"type": "delta", "content": item}
+                else:
+                    assistant_turn = item
+        else:
+            assistant_turn = await create_completion(PREFIX_MESSAGES + history_window(history), tool_choice, not request.no_cache)
         
-        # Add user message
-        conversations[conversation_id].append({
-            "role": "user",
-            "content": request.message
-        })
+        # finish_reason is the primary stop signal: a "stop" or "length"
+        # turn is final even if it also carries a tool_calls list
+        if assistant_turn["finish_reason"] in ("stop", "length") or not assistant_turn["tool_calls"]:
+            final_response = assistant_turn["content"] or "I apologize, but I couldn't generate a response."
+            
+            # Add final response to conversation
+            history.append({
+                "role": "assistant",
+                "content": final_response
+            })
+            await conversation_store.append(conversation_id, history[stored_count:])
+            
+            chat_response = ChatResponse(
+                response=final_response,
+                conversation_id=conversation_id,
+                tool_calls=tool_calls_made
+            )
+            if cache_embedding is not None:
+                try:
+                    semantic_cache.add(cache_embedding, chat_response.model_dump())
+                except Exception as e:
+                    logger.warning(f"Semantic cache add skipped: {e}")
+            yield {"type": "done", "response": chat_response}
+            return
         
-        # Add context if provided
-        if request.context:
-            context_msg = f"\n\nEnvironment context: {json.dumps(request.context, indent=2)}"
-            conversations[conversation_id][-1]["content"] += context_msg
+        # Content alongside tool calls means the model is already writing
+        # its answer: run these tools, then give it one final round
+        if assistant_turn["content"]:
+            max_iterations = min(max_iterations, iteration + 1)
         
-        # Call OpenAI with tools
-        client = get_openai_client()
-        tool_calls_made = []
+        # Add assistant message with tool calls
+        history.append({
+            "role": "assistant",
+            "content": assistant_turn["content"] or "",
+            "tool_calls": assistant_turn["tool_calls"]
+        })
         
-        # Agentic loop - keep calling until no more tool calls
-        max_iterations = 10
-        iteration = 0
+        for tool_call in assistant_turn["tool_calls"]:
+            yield {"type": "tool_call", "tool_name": tool_call["function"]["name"]}
         
-        while iteration < max_iterations:
-            iteration += 1
-            
-            response = client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT,
-                messages=conversations[conversation_id],
-                tools=TOOL_DEFINITIONS,
-                tool_choice="auto"
+        # Execute the turn's tool calls concurrently; gather keeps
+        # results in the same order as the requested calls
+        results = await asyncio.gather(
+            *[execute_tool_call(tc) for tc in assistant_turn["tool_calls"]]
+        )
+        
+        for tool_call, (function_args, result) in zip(assistant_turn["tool_calls"], results):
+            tool_call_made = ToolCall(
+                tool_name=tool_call["function"]["name"],
+                arguments=function_args,
+                result=result
             )
+            tool_calls_made.append(tool_call_made)
+            yield {"type": "tool_result", **tool_call_made.model_dump()}
             
-            assistant_message = response.choices[0].message
-            
-            # Check if there are tool calls
-            if assistant_message.tool_calls:
-                # Add assistant message with tool calls
-                conversations[conversation_id].append({
-                    "role": "assistant",
-                    "content": assistant_message.content or "",
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        }
-                        for tc in assistant_message.tool_calls
-                    ]
-                })
-                
-                # Execute each tool call
-                for tool_call in assistant_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    logger.info(f"Calling tool: {function_name} with args: {function_args}")
-                    
-                    if function_name in TOOL_FUNCTIONS:
-                        result = TOOL_FUNCTIONS[function_name](**function_args)
-                    else:
-                        result = {"error": f"Unknown tool: {function_name}"}
-                    
-                    tool_calls_made.append(ToolCall(
-                        tool_name=function_name,
-                        arguments=function_args,
-                        result=result
-                    ))
-                    
-                    # Add tool result to conversation
-                    conversations[conversation_id].append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(result)
-                    })
-            else:
-                # No more tool calls, we have the final response
-                final_response = assistant_message.content or "I apologize, but I couldn't generate a response."
-                
-                # Add final response to conversation
-                conversations[conversation_id].append({
-                    "role": "assistant",
-                    "content": final_response
-                })
-                
-                return ChatResponse(
-                    response=final_response,
-                    conversation_id=conversation_id,
-                    tool_calls=tool_calls_made
-                )
-        
-        # Max iterations reached
-        return ChatResponse(
-            response="I've gathered a lot of information but reached my processing limit. Here's what I found so far based on the tool calls.",
-            conversation_id=conversation_id,
-            tool_calls=tool_calls_made
-        )
+            # Add tool result to conversation
+            history.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": orjson.dumps(result).decode()
+            })
+    
+    # Max iterations reached
+    await conversation_store.append(conversation_id, history[stored_count:])
+    yield {"type": "done", "response": ChatResponse(
+        response="I've gathered a lot of information but reached my processing limit. Here's what I found so far based on the tool calls.",
+        conversation_id=conversation_id,
+        tool_calls=tool_calls_made
+    )}
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    """
+    Send a message to the IT Admin agent.
+    
+    The agent will analyze the issue, call relevant tools to gather information,
+    and provide a diagnosis with remediation suggestions.
+    """
+    try:
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            async for event in run_agent(request):
+                if event["type"] == "done":
+                    chat_response = event["response"]
+        return chat_response
         
+    except TimeoutError:
+        logger.error("Chat request timed out")
+        raise HTTPException(status_code=504, detail="Request timed out")
     except Exception as e:
         logger.error(f"Error in chat: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/tools/{tool_name}")
+def _sse(event: dict) -> str:
+    return f"data: {orjson.dumps(event).decode()}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Send a message to the IT Admin agent and stream its progress.
+    
+    Returns Server-Sent Events: "tool_call" and "tool_result" events as tools
+    run, "delta" events with generated text, and a final "done" event with the
+    same body as /chat. Errors after the stream has started are sent as an
+    "error" event.
+    """
+    async def event_stream():
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT):
+                async for event in run_agent(request, stream=True):
+                    if event["type"] == "done":
+                        event = {"type": "done", **event["response"].model_dump()}
+                    yield _sse(event)
+        except TimeoutError:
+            logger.error("Chat stream timed out")
+            yield _sse({"type": "error", "detail": "Request timed out"})
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}", exc_info=True)
+            yield _sse({"type": "error", "detail": str(e)})
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.post("/tools/{tool_name}", response_model=ToolInvocationResponse)
 async def call_tool_directly(tool_name: str, arguments: Dict[str, Any]):
     """
     Call a tool directly without the agent (for testing/debugging).
@@ -281,17 +767,18 @@ async def call_tool_directly(tool_name: str, arguments: Dict[str, Any]):
         raise HTTPException(status_code=404, detail=f"Tool '{tool_name}' not found")
     
     try:
-        result = TOOL_FUNCTIONS[tool_name](**arguments)
+        result = await run_tool(tool_name, arguments)
         return {"tool": tool_name, "arguments": arguments, "result": result}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Tool '{tool_name}' timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.delete("/conversations/{conversation_id}")
+@app.delete("/conversations/{conversation_id}", response_model=ConversationDeletedResponse)
 async def clear_conversation(conversation_id: str):
     """Clear a conversation's history."""
-    if conversation_id in conversations:
-        del conversations[conversation_id]
+    if await conversation_store.delete(conversation_id):
         return {"status": "deleted", "conversation_id": conversation_id}
     raise HTTPException(status_code=404, detail="Conversation not found")
 
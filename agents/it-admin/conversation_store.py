@@ -0,0 +1,195 @@
+# Conversation storage for the IT Admin Agent
+# In-memory by default; Redis when REDIS_URL is set so history is shared
+# across uvicorn workers and Container App replicas
+
+from typing import Optional, List
+import os
+import time
+import uuid
+import logging
+import zlib
+
+import msgpack
+import redis.asyncio as redis
+from cachetools import LRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "3600"))  # seconds
+MAX_CONVERSATIONS = int(os.getenv("MAX_CONVERSATIONS", "10000"))
+# Redis entries at least this large are zlib-compressed; tool results are
+# repetitive JSON and shrink ~5x
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "512"))
+
+
+def _encode_message(message: dict) -> bytes:
+    packed = msgpack.packb(message)
+    if len(packed) >= COMPRESS_MIN_BYTES:
+        return zlib.compress(packed, 1)
+    return packed
+
+
+def _decode_message(raw: bytes) -> dict:
+    # zlib streams start with 0x78; a packed message (a map) never does
+    if raw[:1] == b"\x78":
+        raw = zlib.decompress(raw)
+    return msgpack.unpackb(raw)
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that counts entries dropped because the cache was full."""
+
+    def __init__(self, maxsize, ttl, timer=time.monotonic):
+        super().__init__(maxsize, ttl, timer)
+        self.evictions = 0
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.evictions += 1
+        logger.info(f"Evicted conversation {key} (total evictions: {self.evictions})")
+        return key, value
+
+
+class InMemoryConversationStore:
+    """Process-local conversation history (single worker only).
+
+    Bounded to `max_conversations`, least recently used first, and entries
+    expire `ttl` seconds after their last write. All access happens on the
+    event loop without awaiting, so no lock is needed.
+    """
+
+    def __init__(self, max_conversations: int = MAX_CONVERSATIONS, ttl: int = CONVERSATION_TTL,
+                 timer=time.monotonic):
+        self._conversations = _CountingTTLCache(max_conversations, ttl, timer)
+
+    @property
+    def evictions(self) -> int:
+        return self._conversations.evictions
+
+    async def get(self, conversation_id: str) -> Optional[List[dict]]:
+        # Copy so callers appending to a history don't change the stored one
+        # until they set() it; messages themselves are never mutated
+        messages = self._conversations.get(conversation_id)
+        return list(messages) if messages is not None else None
+
+    async def set(self, conversation_id: str, messages: List[dict]) -> None:
+        self._conversations[conversation_id] = list(messages)
+
+    async def append(self, conversation_id: str, messages: List[dict]) -> None:
+        """Add messages to the end of a conversation, creating it if needed."""
+        stored = self._conversations.get(conversation_id, [])
+        stored.extend(messages)
+        # Reassigning restarts the entry's TTL
+        self._conversations[conversation_id] = stored
+
+    async def delete(self, conversation_id: str) -> bool:
+        return self._conversations.pop(conversation_id, None) is not None
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisConversationStore:
+    """Conversation history in Redis with a sliding TTL.
+
+    Each conversation is a list with one msgpack-encoded message per entry,
+    so appending a turn writes only its new messages, not the whole history.
+    Large entries are zlib-compressed.
+
+    Recently used histories are also kept decoded in process, tagged with
+    the conversation's generation: a random token stored beside the list,
+    replaced by set() and removed with it by delete() or expiry. Appends
+    keep the generation, so a read fetches it together with just the
+    entries appended since, in one round trip; a changed or missing
+    generation means the list was replaced and it is read in full.
+    """
+
+    KEY_PREFIX = "conv:messages:"
+    GENERATION_PREFIX = "conv:generation:"
+
+    def __init__(self, client: "redis.Redis", ttl: int = CONVERSATION_TTL, local_cache_size: int = 1024):
+        self._redis = client
+        self._ttl = ttl
+        # Validated against the generation on every read, so no TTL needed
+        self._local = LRUCache(local_cache_size)
+
+    async def get(self, conversation_id: str) -> Optional[List[dict]]:
+        key = self.KEY_PREFIX + conversation_id
+        generation_key = self.GENERATION_PREFIX + conversation_id
+        messages = None
+        cached = self._local.get(conversation_id)
+        if cached is not None:
+            cached_generation, cached_messages = cached
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.get(generation_key)
+            pipe.lrange(key, len(cached_messages), -1)
+            generation, tail = await pipe.execute()
+            if generation is not None and generation == cached_generation:
+                messages = cached_messages + [_decode_message(m) for m in tail]
+        if messages is None:
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.get(generation_key)
+            # A missing key reads as an empty list
+            pipe.lrange(key, 0, -1)
+            generation, entries = await pipe.execute()
+            messages = [_decode_message(m) for m in entries]
+        if not messages or generation is None:
+            self._local.pop(conversation_id, None)
+            return list(messages) or None
+        self._local[conversation_id] = (generation, messages)
+        # Copy so callers appending to a history don't change the cached one
+        return list(messages)
+
+    async def set(self, conversation_id: str, messages: List[dict]) -> None:
+        key = self.KEY_PREFIX + conversation_id
+        generation_key = self.GENERATION_PREFIX + conversation_id
+        self._local.pop(conversation_id, None)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(key, generation_key)
+        if messages:
+            pipe.rpush(key, *map(_encode_message, messages))
+            pipe.expire(key, self._ttl)
+            pipe.set(generation_key, uuid.uuid4().hex, ex=self._ttl)
+        await pipe.execute()
+
+    async def append(self, conversation_id: str, messages: List[dict]) -> None:
+        """Add messages to the end of a conversation, creating it if needed."""
+        if not messages:
+            return
+        key = self.KEY_PREFIX + conversation_id
+        generation_key = self.GENERATION_PREFIX + conversation_id
+        pipe = self._redis.pipeline(transaction=True)
+        # A new (or recreated) list gets a fresh generation
+        pipe.set(generation_key, uuid.uuid4().hex, nx=True)
+        pipe.rpush(key, *map(_encode_message, messages))
+        pipe.expire(key, self._ttl)
+        pipe.expire(generation_key, self._ttl)
+        pipe.get(generation_key)
+        _, length, _, _, generation = await pipe.execute()
+        # Extend the local copy only if no other worker wrote in between
+        cached = self._local.pop(conversation_id, None)
+        if cached is not None:
+            cached_generation, cached_messages = cached
+            if generation == cached_generation and length == len(cached_messages) + len(messages):
+                self._local[conversation_id] = (generation, cached_messages + list(messages))
+
+    async def delete(self, conversation_id: str) -> bool:
+        self._local.pop(conversation_id, None)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(self.KEY_PREFIX + conversation_id)
+        pipe.delete(self.GENERATION_PREFIX + conversation_id)
+        deleted, _ = await pipe.execute()
+        return deleted > 0
+
+    async def close(self) -> None:
+        """Close the connection pool; called on app shutdown."""
+        await self._redis.aclose()
+
+
+def create_conversation_store():
+    """Pick the conversation store backend from the environment."""
+    if REDIS_URL:
+        logger.info("Using Redis conversation store")
+        return RedisConversationStore(redis.Redis.from_url(REDIS_URL))
+    return InMemoryConversationStore()
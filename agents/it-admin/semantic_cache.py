@@ -0,0 +1,132 @@
+# Semantic response cache for the IT Admin Agent
+# Serves repeated troubleshooting prompts without re-running the agentic loop
+
+from typing import Optional, List, Dict, Any
+import json
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(vector) -> np.ndarray:
+    """Return a unit-length float32 copy of an embedding vector."""
+    v = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+class SemanticCache:
+    """In-process nearest-neighbour cache over normalized prompt embeddings.
+
+    Embeddings are stored unit-length, so the inner product of a query with
+    every stored row is its cosine similarity (a flat inner-product index).
+    Rows live in a matrix preallocated to max_entries on first add and used
+    as a ring, so adding never copies the stored rows; when full, the oldest
+    entry is overwritten. With a ttl (seconds), entries older than that no
+    longer match; 0 keeps them until evicted. Entries embedded at a
+    different dimension (the embedding model changed) can never match, so a
+    lookup that meets them drops them and misses.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1000, ttl: float = 0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._embeddings: Optional[np.ndarray] = None
+        self._added = np.zeros(max_entries)  # time.time() each row was added
+        self._entries: List[Dict[str, Any]] = []  # row i's entry
+        self._next = 0  # row the next add writes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Dimension of the stored embeddings, or None before the first add."""
+        return None if self._embeddings is None else self._embeddings.shape[1]
+
+    def lookup(self, embedding) -> Optional[Dict[str, Any]]:
+        """Return the cached entry most similar to `embedding`, if above threshold."""
+        n = len(self._entries)
+        if not n:
+            return None
+        query = normalize(embedding)
+        if query.size != self.dim:
+            logger.warning(
+                f"Dropping {n} semantic cache entries: stored dimension {self.dim}, "
+                f"query dimension {query.size}"
+            )
+            self.clear()
+            return None
+        scores = self._embeddings[:n] @ query
+        if self.ttl:
+            scores[self._added[:n] < time.time() - self.ttl] = -np.inf
+        best = int(scores.argmax())
+        if scores[best] >= self.threshold:
+            logger.info(f"Semantic cache hit (similarity={scores[best]:.3f})")
+            return self._entries[best]
+        return None
+
+    def add(self, embedding, entry: Dict[str, Any], added: Optional[float] = None) -> None:
+        """Store an entry under its prompt embedding."""
+        row = normalize(embedding)
+        if self._embeddings is None:
+            self._embeddings = np.empty((self.max_entries, row.size), dtype=np.float32)
+        elif row.size != self.dim:
+            logger.warning(f"Semantic cache add skipped: dimension {row.size}, expected {self.dim}")
+            return
+        i = self._next
+        self._embeddings[i] = row
+        self._added[i] = time.time() if added is None else added
+        if i == len(self._entries):
+            self._entries.append(entry)
+        else:
+            self._entries[i] = entry
+        self._next = (i + 1) % self.max_entries
+
+    def clear(self) -> None:
+        self._embeddings = None
+        self._added = np.zeros(self.max_entries)
+        self._entries = []
+        self._next = 0
+
+    def _oldest_first(self) -> np.ndarray:
+        """Row indices from oldest to newest entry."""
+        n = len(self._entries)
+        start = self._next if n == self.max_entries else 0
+        return (np.arange(n) + start) % n
+
+    def save(self, path: str) -> None:
+        """Persist the cache to an .npz file."""
+        if not self._entries:
+            return
+        order = self._oldest_first()
+        np.savez(
+            path,
+            embeddings=self._embeddings[order],
+            added=self._added[order],
+            entries=np.array(json.dumps([self._entries[i] for i in order]))
+        )
+        logger.info(f"Saved {len(self._entries)} semantic cache entries to {path}")
+
+    def load(self, path: str) -> None:
+        """Load a cache previously written with save()."""
+        with np.load(path) as data:
+            embeddings = data["embeddings"]
+            entries = json.loads(str(data["entries"]))
+            # Files saved before entries were timestamped count as fresh
+            added = data["added"] if "added" in data else np.full(len(entries), time.time())
+        if self.dim is not None and embeddings.shape[1] != self.dim:
+            logger.warning(
+                f"Ignoring semantic cache file {path}: dimension {embeddings.shape[1]}, "
+                f"expected {self.dim}"
+            )
+            return
+        self.clear()
+        # Oldest first, so only the newest max_entries are kept
+        for embedding, entry, when in zip(embeddings, entries, added):
+            self.add(embedding, entry, added=float(when))
+        logger.info(f"Loaded {len(self._entries)} semantic cache entries from {path}")
@@ -1,12 +1,73 @@
 # Pytest configuration for IT Admin Agent tests
 
 import pytest
-import sys
-import os
+from collections import namedtuple
+from functools import lru_cache
+from types import SimpleNamespace
 
-# Ensure the parent directory (agents/it-admin) is in the path
-# This allows imports like `from tools import ...` and `from app import ...`
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    """API test client shared by the session; app lifespan runs once."""
+    from app import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def tool_index():
+    """TOOL_DEFINITIONS flattened into parallel tuples, computed once.
+    
+    names[i] and parameters[i] describe the same tool; required holds the
+    (name, parameters) pairs of tools that declare required arguments.
+    """
+    from tools import TOOL_DEFINITIONS
+    names = tuple(t["function"]["name"] for t in TOOL_DEFINITIONS)
+    parameters = tuple(t["function"]["parameters"] for t in TOOL_DEFINITIONS)
+    return {
+        "names": names,
+        "parameters": parameters,
+        "required": tuple(
+            (name, params) for name, params in zip(names, parameters) if "required" in params
+        )
+    }
+
+
+MockResource = namedtuple("MockResource", "type config upstream downstream")
+
+
+@pytest.fixture(scope="session")
+def mock_resource_index():
+    """MOCK_RESOURCES by name, with dependencies as frozensets, built once."""
+    from tools import MOCK_RESOURCES
+    return {
+        name: MockResource(
+            resource["type"],
+            resource["config"],
+            frozenset(resource["dependencies"]["upstream"]),
+            frozenset(resource["dependencies"]["downstream"])
+        )
+        for name, resource in MOCK_RESOURCES.items()
+    }
+
+
+@pytest.fixture(scope="session")
+def cached_tools():
+    """Memoized wrappers for the tools that return fixed mock data.
+    
+    Repeated calls with the same arguments across tests reuse the first
+    result. Only for tools whose output doesn't depend on randomness;
+    callers must not mutate the returned dicts.
+    """
+    from tools import get_system_config, check_dependencies, get_resource_details, get_service_health
+    return SimpleNamespace(
+        get_system_config=lru_cache(maxsize=None)(get_system_config),
+        check_dependencies=lru_cache(maxsize=None)(check_dependencies),
+        get_resource_details=lru_cache(maxsize=None)(get_resource_details),
+        get_service_health=lru_cache(maxsize=None)(get_service_health),
+    )
 
 
 @pytest.fixture
@@ -38,7 +99,7 @@ def sample_tool_arguments():
             "limit": 10
         },
         "get_service_health": {
-            "service_name": "Azure SQL",
+            "service": "Azure SQL",
             "region": "eastus"
         },
         "get_recent_changes": {
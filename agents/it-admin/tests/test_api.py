@@ -1,41 +1,108 @@
 # IT Admin Agent API Tests
 # Run with: pytest tests/ -v
 
+import asyncio
+import orjson
+import time
 import pytest
-import sys
 from unittest.mock import patch, MagicMock, AsyncMock
-from fastapi.testclient import TestClient
 
-# Add parent directory to path for imports
-sys.path.insert(0, '.')
+from app import app, TOOL_FUNCTIONS, TOOL_DEFINITIONS, SYSTEM_PROMPT, semantic_cache, _completion_cache, _embedding_cache, _tool_cache, create_completion, embed, history_window
 
-from app import app, TOOL_FUNCTIONS
 
+@pytest.fixture(autouse=True)
+def clear_response_caches():
+    """Keep cached model output from leaking between tests."""
+    _completion_cache.clear()
+    semantic_cache.clear()
+    _embedding_cache.clear()
+    _tool_cache.clear()
 
-client = TestClient(app)
+
+def _mock_completion(content, tool_calls=None, finish_reason="stop"):
+    """Build a mock chat completion response with a single choice."""
+    mock_message = MagicMock()
+    mock_message.content = content
+    mock_message.tool_calls = tool_calls
+    
+    mock_choice = MagicMock()
+    mock_choice.message = mock_message
+    mock_choice.finish_reason = finish_reason
+    
+    mock_response = MagicMock()
+    mock_response.choices = [mock_choice]
+    return mock_response
+
+
+def _mock_tool_call(call_id, name, arguments):
+    """Build a mock tool call as returned by the model."""
+    mock_tool_call = MagicMock()
+    mock_tool_call.id = call_id
+    mock_tool_call.function.name = name
+    mock_tool_call.function.arguments = arguments
+    return mock_tool_call
+
+
+def _mock_stream(*deltas):
+    """Build a mock streamed completion from (content, tool_calls, finish_reason) deltas."""
+    chunks = []
+    for content, tool_calls, finish_reason in deltas:
+        mock_choice = MagicMock()
+        mock_choice.delta.content = content
+        mock_choice.delta.tool_calls = tool_calls
+        mock_choice.finish_reason = finish_reason
+        mock_chunk = MagicMock()
+        mock_chunk.choices = [mock_choice]
+        chunks.append(mock_chunk)
+    
+    async def stream():
+        # Azure sends a content filter chunk without choices first
+        yield MagicMock(choices=[])
+        for chunk in chunks:
+            yield chunk
+    return stream()
+
+
+def _mock_tool_call_delta(index, call_id, name, arguments):
+    """Build a streamed tool call fragment."""
+    mock_delta = MagicMock()
+    mock_delta.index = index
+    mock_delta.id = call_id
+    mock_delta.function.name = name
+    mock_delta.function.arguments = arguments
+    return mock_delta
+
+
+def _sse_events(response):
+    """Parse a Server-Sent Events response body into event dicts."""
+    return [
+        orjson.loads(line[len("data: "):])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
 
 
 class TestHealthEndpoint:
     """Test /health endpoint."""
     
-    def test_health_returns_200(self):
+    def test_health_returns_200(self, client):
         """Test health check returns 200."""
         response = client.get("/health")
         assert response.status_code == 200
     
-    def test_health_returns_healthy_status(self):
+    def test_health_returns_healthy_status(self, client):
         """Test health check returns healthy status."""
         response = client.get("/health")
         data = response.json()
         assert data["status"] == "healthy"
     
-    def test_health_includes_timestamp(self):
+    def test_health_includes_timestamp(self, client):
         """Test health check includes timestamp."""
         response = client.get("/health")
         data = response.json()
         assert "timestamp" in data
     
-    def test_health_includes_config_flags(self):
+    def test_health_includes_config_flags(self, client):
         """Test health check includes configuration flags."""
         response = client.get("/health")
         data = response.json()
@@ -46,12 +113,12 @@ class TestHealthEndpoint:
 class TestToolsEndpoint:
     """Test /tools endpoint."""
     
-    def test_tools_returns_200(self):
+    def test_tools_returns_200(self, client):
         """Test tools endpoint returns 200."""
         response = client.get("/tools")
         assert response.status_code == 200
     
-    def test_tools_returns_tools_list(self):
+    def test_tools_returns_tools_list(self, client):
         """Test tools endpoint returns tools in expected format."""
         response = client.get("/tools")
         data = response.json()
@@ -59,13 +126,19 @@ class TestToolsEndpoint:
         assert isinstance(data["tools"], list)
         assert len(data["tools"]) == 7
     
-    def test_tools_has_description(self):
+    def test_tools_match_definitions(self, client):
+        """Test pre-serialized tools payload matches TOOL_DEFINITIONS."""
+        response = client.get("/tools")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["tools"] == TOOL_DEFINITIONS
+    
+    def test_tools_has_description(self, client):
         """Test tools response includes description."""
         response = client.get("/tools")
         data = response.json()
         assert "description" in data
     
-    def test_tools_structure(self):
+    def test_tools_structure(self, client):
         """Test each tool has OpenAI function calling structure."""
         response = client.get("/tools")
         data = response.json()
@@ -78,7 +151,7 @@ class TestToolsEndpoint:
 class TestToolInvocationEndpoint:
     """Test /tools/{tool_name} endpoint."""
     
-    def test_get_system_config(self):
+    def test_get_system_config(self, client):
         """Test direct invocation of get_system_config."""
         response = client.post(
             "/tools/get_system_config",
@@ -91,7 +164,7 @@ class TestToolInvocationEndpoint:
         assert data["result"]["resource_name"] == "web-app-prod"
         assert "configuration" in data["result"]
     
-    def test_get_system_metrics(self):
+    def test_get_system_metrics(self, client):
         """Test direct invocation of get_system_metrics."""
         response = client.post(
             "/tools/get_system_metrics",
@@ -103,7 +176,7 @@ class TestToolInvocationEndpoint:
         assert "data" in data["result"]
         assert "cpu" in data["result"]["data"]
     
-    def test_get_recent_logs(self):
+    def test_get_recent_logs(self, client):
         """Test direct invocation of get_recent_logs."""
         response = client.post(
             "/tools/get_recent_logs",
@@ -114,7 +187,7 @@ class TestToolInvocationEndpoint:
         assert data["tool"] == "get_recent_logs"
         assert "logs" in data["result"]
     
-    def test_get_service_health(self):
+    def test_get_service_health(self, client):
         """Test direct invocation of get_service_health."""
         response = client.post(
             "/tools/get_service_health",
@@ -125,7 +198,7 @@ class TestToolInvocationEndpoint:
         assert data["tool"] == "get_service_health"
         assert data["result"]["status"] == "degraded"
     
-    def test_get_service_health_healthy(self):
+    def test_get_service_health_healthy(self, client):
         """Test get_service_health for healthy service."""
         response = client.post(
             "/tools/get_service_health",
@@ -135,7 +208,7 @@ class TestToolInvocationEndpoint:
         data = response.json()
         assert data["result"]["status"] == "healthy"
     
-    def test_get_recent_changes(self):
+    def test_get_recent_changes(self, client):
         """Test direct invocation of get_recent_changes."""
         response = client.post(
             "/tools/get_recent_changes",
@@ -146,7 +219,7 @@ class TestToolInvocationEndpoint:
         assert data["tool"] == "get_recent_changes"
         assert "changes" in data["result"]
     
-    def test_check_dependencies(self):
+    def test_check_dependencies(self, client):
         """Test direct invocation of check_dependencies."""
         response = client.post(
             "/tools/check_dependencies",
@@ -158,7 +231,7 @@ class TestToolInvocationEndpoint:
         assert "upstream_dependencies" in data["result"]
         assert "downstream_dependencies" in data["result"]
     
-    def test_get_resource_details(self):
+    def test_get_resource_details(self, client):
         """Test direct invocation of get_resource_details."""
         response = client.post(
             "/tools/get_resource_details",
@@ -169,24 +242,46 @@ class TestToolInvocationEndpoint:
         assert data["tool"] == "get_resource_details"
         assert data["result"]["resource_type"] == "container_app"
     
-    def test_unknown_tool_returns_404(self):
+    def test_unknown_tool_returns_404(self, client):
         """Test unknown tool returns 404."""
         response = client.post(
             "/tools/unknown_tool",
             json={"param": "value"}
         )
         assert response.status_code == 404
+    
+    def test_repeated_call_uses_tool_cache(self, client):
+        """Test identical calls reuse the cached result."""
+        mock_tool = MagicMock(return_value={"status": "ok"})
+        with patch.dict(TOOL_FUNCTIONS, {"get_resource_details": mock_tool}):
+            first = client.post("/tools/get_resource_details", json={"resource_name": "web-app-prod"})
+            second = client.post("/tools/get_resource_details", json={"resource_name": "web-app-prod"})
+            other = client.post("/tools/get_resource_details", json={"resource_name": "sql-db-prod"})
+        
+        assert first.json()["result"] == second.json()["result"] == {"status": "ok"}
+        assert other.status_code == 200
+        assert mock_tool.call_count == 2
+    
+    def test_failed_call_is_not_cached(self, client):
+        """Test tool failures are retried on the next call."""
+        mock_tool = MagicMock(side_effect=[RuntimeError("backend down"), {"status": "ok"}])
+        with patch.dict(TOOL_FUNCTIONS, {"get_resource_details": mock_tool}):
+            first = client.post("/tools/get_resource_details", json={"resource_name": "web-app-prod"})
+            second = client.post("/tools/get_resource_details", json={"resource_name": "web-app-prod"})
+        
+        assert first.status_code == 500
+        assert second.json()["result"] == {"status": "ok"}
 
 
 class TestChatEndpoint:
     """Test /chat endpoint."""
     
-    def test_chat_missing_message(self):
+    def test_chat_missing_message(self, client):
         """Test chat without message returns 422."""
         response = client.post("/chat", json={})
         assert response.status_code == 422
     
-    def test_chat_with_empty_message(self):
+    def test_chat_with_empty_message(self, client):
         """Test chat with empty message."""
         response = client.post("/chat", json={"message": ""})
         # Empty string is technically valid but may produce minimal results
@@ -195,7 +290,7 @@ class TestChatEndpoint:
         assert response.status_code in [200, 500]  # 500 if OpenAI not configured
     
     @patch('app.get_openai_client')
-    def test_chat_success(self, mock_get_client):
+    def test_chat_success(self, mock_get_client, client):
         """Test chat endpoint with mocked OpenAI client."""
         # Create mock response
         mock_message = MagicMock()
@@ -213,7 +308,7 @@ class TestChatEndpoint:
         mock_client = MagicMock()
         mock_client.chat = MagicMock()
         mock_client.chat.completions = MagicMock()
-        mock_client.chat.completions.create = MagicMock(return_value=mock_response)
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         mock_get_client.return_value = mock_client
         
         response = client.post(
@@ -228,7 +323,7 @@ class TestChatEndpoint:
         assert "conversation_id" in data
     
     @patch('app.get_openai_client')
-    def test_chat_with_tool_calls(self, mock_get_client):
+    def test_chat_with_tool_calls(self, mock_get_client, client):
         """Test chat endpoint handles tool calls."""
         # First response: tool call
         mock_tool_call = MagicMock()
@@ -276,7 +371,7 @@ class TestChatEndpoint:
         mock_client = MagicMock()
         mock_client.chat = MagicMock()
         mock_client.chat.completions = MagicMock()
-        mock_client.chat.completions.create = MagicMock(
+        mock_client.chat.completions.create = AsyncMock(
             side_effect=[mock_response1, mock_response2]
         )
         mock_get_client.return_value = mock_client
@@ -293,6 +388,462 @@ class TestChatEndpoint:
         assert "tool_calls" in data
 
 
+    @patch('app.get_openai_client')
+    def test_chat_with_parallel_tool_calls(self, mock_get_client, client):
+        """Test multiple tool calls in one turn are all executed in order."""
+        calls = [
+            ("call_1", "check_dependencies", '{"resource_name": "web-app-prod"}'),
+            ("call_2", "get_service_health", '{"service": "Azure SQL", "region": "eastus"}'),
+            ("call_3", "get_resource_details", '{not valid json'),
+        ]
+        mock_tool_calls = []
+        for call_id, name, arguments in calls:
+            mock_tool_call = MagicMock()
+            mock_tool_call.id = call_id
+            mock_tool_call.function = MagicMock()
+            mock_tool_call.function.name = name
+            mock_tool_call.function.arguments = arguments
+            mock_tool_calls.append(mock_tool_call)
+        
+        mock_message1 = MagicMock()
+        mock_message1.content = None
+        mock_message1.tool_calls = mock_tool_calls
+        
+        mock_choice1 = MagicMock()
+        mock_choice1.message = mock_message1
+        mock_choice1.finish_reason = "tool_calls"
+        
+        mock_response1 = MagicMock()
+        mock_response1.choices = [mock_choice1]
+        
+        mock_message2 = MagicMock()
+        mock_message2.content = "web-app-prod depends on sql-db-main, which has an active incident."
+        mock_message2.tool_calls = None
+        
+        mock_choice2 = MagicMock()
+        mock_choice2.message = mock_message2
+        mock_choice2.finish_reason = "stop"
+        
+        mock_response2 = MagicMock()
+        mock_response2.choices = [mock_choice2]
+        
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(
+            side_effect=[mock_response1, mock_response2]
+        )
+        mock_get_client.return_value = mock_client
+        
+        response = client.post(
+            "/chat",
+            json={"message": "Why is web-app-prod failing?"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [tc["tool_name"] for tc in data["tool_calls"]] == [
+            "check_dependencies", "get_service_health", "get_resource_details"
+        ]
+        assert "sql-db-main" in data["tool_calls"][0]["result"]["upstream_dependencies"]
+        assert data["tool_calls"][1]["result"]["status"] == "degraded"
+        # Malformed arguments are reported back to the model, not raised
+        assert "error" in data["tool_calls"][2]["result"]
+        
+        # Tool results are sent back in the same order as the calls
+        second_call_messages = mock_client.chat.completions.create.call_args.kwargs["messages"]
+        assert second_call_messages[0] == {"role": "system", "content": SYSTEM_PROMPT}
+        tool_messages = [m for m in second_call_messages if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_messages] == ["call_1", "call_2", "call_3"]
+
+
+    @patch('app.AZURE_OPENAI_EMBEDDING_DEPLOYMENT', 'text-embedding-3-small')
+    @patch('app.embed', new_callable=AsyncMock)
+    @patch('app.get_openai_client')
+    def test_chat_semantic_cache_hit(self, mock_get_client, mock_embed, client):
+        """Test a repeated first-turn prompt is served from the semantic cache."""
+        mock_embed.return_value = [0.6, 0.8, 0.0]
+        
+        mock_message = MagicMock()
+        mock_message.content = "web-app-prod CPU is at 85%."
+        mock_message.tool_calls = None
+        
+        mock_choice = MagicMock()
+        mock_choice.message = mock_message
+        mock_choice.finish_reason = "stop"
+        
+        mock_response = MagicMock()
+        mock_response.choices = [mock_choice]
+        
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+        
+        first = client.post("/chat", json={"message": "Check web-app-prod CPU"})
+        second = client.post("/chat", json={"message": "check CPU on web-app-prod"})
+        
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.json()["response"] == first.json()["response"]
+        assert second.json()["conversation_id"] != first.json()["conversation_id"]
+        # Second request never reached the model
+        assert mock_client.chat.completions.create.await_count == 1
+    
+    @patch('app.AZURE_OPENAI_EMBEDDING_DEPLOYMENT', 'text-embedding-3-small')
+    @patch('app.embed', new_callable=AsyncMock)
+    @patch('app.get_openai_client')
+    def test_chat_no_cache_skips_semantic_cache(self, mock_get_client, mock_embed, client):
+        """Test no_cache runs the agent even for a previously answered prompt."""
+        mock_embed.return_value = [0.6, 0.8, 0.0]
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[
+            _mock_completion("web-app-prod CPU is at 85%."),
+            _mock_completion("web-app-prod CPU is now at 60%.")
+        ])
+        mock_get_client.return_value = mock_client
+        
+        client.post("/chat", json={"message": "Check web-app-prod CPU"})
+        response = client.post("/chat", json={"message": "check CPU on web-app-prod", "no_cache": True})
+        
+        assert response.status_code == 200
+        assert response.json()["response"] == "web-app-prod CPU is now at 60%."
+        assert mock_client.chat.completions.create.await_count == 2
+    
+    @patch('app.AZURE_OPENAI_EMBEDDING_DEPLOYMENT', 'text-embedding-3-small')
+    @patch('app.embed', new_callable=AsyncMock)
+    @patch('app.get_openai_client')
+    def test_chat_survives_embedding_dimension_change(self, mock_get_client, mock_embed, client):
+        """Test cached vectors from an older embedding model don't fail the request."""
+        semantic_cache.add([1.0, 0.0, 0.0, 0.0], {"response": "stale", "tool_calls": []})
+        mock_embed.return_value = [1.0] + [0.0] * 7
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=_mock_completion("Fresh answer."))
+        mock_get_client.return_value = mock_client
+        
+        response = client.post("/chat", json={"message": "Check web-app-prod CPU"})
+        
+        assert response.status_code == 200
+        assert response.json()["response"] == "Fresh answer."
+        assert len(semantic_cache) == 1
+    
+    @patch('app.get_openai_client')
+    def test_embedding_reused_for_same_text(self, mock_get_client):
+        """Test a repeated prompt is embedded once."""
+        mock_response = MagicMock()
+        mock_response.data = [MagicMock(embedding=[3.0, 4.0])]
+        mock_client = MagicMock()
+        mock_client.embeddings.create = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+        
+        first = asyncio.run(embed("Check web-app-prod CPU"))
+        second = asyncio.run(embed("Check web-app-prod CPU"))
+        
+        assert first.tolist() == pytest.approx([0.6, 0.8])
+        assert second is first
+        assert mock_client.embeddings.create.await_count == 1
+    
+    @patch('app.get_openai_client')
+    def test_chat_no_cache_skips_completion_cache(self, mock_get_client, client):
+        """Test no_cache calls the model again for an identical message."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[
+            _mock_completion("web-app-prod CPU is at 85%."),
+            _mock_completion("web-app-prod CPU is now at 60%.")
+        ])
+        mock_get_client.return_value = mock_client
+        
+        client.post("/chat", json={"message": "Check web-app-prod CPU"})
+        response = client.post("/chat", json={"message": "Check web-app-prod CPU", "no_cache": True})
+        
+        assert response.status_code == 200
+        assert response.json()["response"] == "web-app-prod CPU is now at 60%."
+        assert mock_client.chat.completions.create.await_count == 2
+    
+    @patch('app.get_openai_client')
+    def test_chat_exact_completion_cache_hit(self, mock_get_client, client):
+        """Test an identical conversation reuses the cached completion."""
+        mock_message = MagicMock()
+        mock_message.content = "sql-db-main is affected by an Azure SQL incident."
+        mock_message.tool_calls = None
+        
+        mock_choice = MagicMock()
+        mock_choice.message = mock_message
+        mock_choice.finish_reason = "stop"
+        
+        mock_response = MagicMock()
+        mock_response.choices = [mock_choice]
+        
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+        
+        first = client.post("/chat", json={"message": "Is sql-db-main healthy?"})
+        second = client.post("/chat", json={"message": "Is sql-db-main healthy?"})
+        different = client.post("/chat", json={"message": "Is redis-cache-prod healthy?"})
+        
+        assert first.status_code == second.status_code == different.status_code == 200
+        assert second.json()["response"] == first.json()["response"]
+        # Only the distinct conversation reached the model a second time
+        assert mock_client.chat.completions.create.await_count == 2
+
+
+    @patch('app.get_openai_client')
+    def test_new_conversations_get_unique_ids(self, mock_get_client, client):
+        """Test each new conversation is assigned a distinct id."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=_mock_completion("All good."))
+        mock_get_client.return_value = mock_client
+        
+        ids = {
+            client.post("/chat", json={"message": "Status?"}).json()["conversation_id"]
+            for _ in range(5)
+        }
+        
+        assert len(ids) == 5
+        assert all(conversation_id.startswith("conv_") for conversation_id in ids)
+    
+    @patch('app.conversation_store.get', new_callable=AsyncMock)
+    @patch('app.get_openai_client')
+    def test_new_conversation_skips_history_read(self, mock_get_client, mock_get, client):
+        """Test only requests naming a conversation load its history."""
+        mock_get.return_value = None
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=_mock_completion("All good."))
+        mock_get_client.return_value = mock_client
+        
+        conversation_id = client.post("/chat", json={"message": "Status?"}).json()["conversation_id"]
+        assert mock_get.await_count == 0
+        
+        client.post("/chat", json={"message": "And now?", "conversation_id": conversation_id})
+        mock_get.assert_awaited_once_with(conversation_id)
+    
+    @patch('app.get_openai_client')
+    def test_chat_stop_finish_reason_ends_loop(self, mock_get_client, client):
+        """Test finish_reason 'stop' is final even with tool_calls present."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=_mock_completion(
+            "web-app-prod is healthy.",
+            tool_calls=[_mock_tool_call("call_1", "get_system_metrics", '{"resource_name": "web-app-prod"}')],
+            finish_reason="stop"
+        ))
+        mock_get_client.return_value = mock_client
+        
+        response = client.post("/chat", json={"message": "Is web-app-prod ok?"})
+        
+        assert response.status_code == 200
+        assert response.json()["response"] == "web-app-prod is healthy."
+        assert response.json()["tool_calls"] == []
+        assert mock_client.chat.completions.create.await_count == 1
+    
+    @patch('app.get_openai_client')
+    def test_chat_content_with_tool_calls_forces_final_round(self, mock_get_client, client):
+        """Test a drafted answer plus tool calls gets one tool-free final round."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[
+            _mock_completion(
+                "CPU looks high; confirming with metrics.",
+                tool_calls=[_mock_tool_call("call_1", "get_system_metrics", '{"resource_name": "web-app-prod", "metric_type": "cpu"}')],
+                finish_reason="tool_calls"
+            ),
+            _mock_completion("CPU on web-app-prod is critical."),
+        ])
+        mock_get_client.return_value = mock_client
+        
+        response = client.post("/chat", json={"message": "Why is web-app-prod slow?"})
+        
+        assert response.status_code == 200
+        assert response.json()["response"] == "CPU on web-app-prod is critical."
+        calls = mock_client.chat.completions.create.call_args_list
+        assert calls[0].kwargs["tool_choice"] == "auto"
+        assert calls[1].kwargs["tool_choice"] == "none"
+
+
+@pytest.mark.serial
+class TestTimeouts:
+    """Test tool and model call timeouts."""
+    
+    @patch('app.TOOL_TIMEOUT', 0.05)
+    @patch('app.get_openai_client')
+    def test_tool_timeout_reported_to_model(self, mock_get_client, client):
+        """Test a hung tool returns a timeout error and the agent continues."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[
+            _mock_completion(
+                None,
+                tool_calls=[_mock_tool_call("call_1", "get_resource_details", '{"resource_name": "web-app-prod"}')],
+                finish_reason="tool_calls"
+            ),
+            _mock_completion("Resource details are unavailable right now."),
+        ])
+        mock_get_client.return_value = mock_client
+        
+        slow_tool = MagicMock(side_effect=lambda **kwargs: time.sleep(0.5))
+        with patch.dict(TOOL_FUNCTIONS, {"get_resource_details": slow_tool}):
+            response = client.post("/chat", json={"message": "Describe web-app-prod"})
+        
+        assert response.status_code == 200
+        assert response.json()["tool_calls"][0]["result"] == {"error": "timeout"}
+        assert response.json()["response"] == "Resource details are unavailable right now."
+    
+    @patch('app.OPENAI_TIMEOUT', 0.05)
+    @patch('app.get_openai_client')
+    def test_model_timeout_returns_504(self, mock_get_client, client):
+        """Test a hung model call fails the request with 504."""
+        async def hang(**kwargs):
+            await asyncio.sleep(1)
+        
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = hang
+        mock_get_client.return_value = mock_client
+        
+        response = client.post("/chat", json={"message": "Status?"})
+        
+        assert response.status_code == 504
+
+
+@pytest.mark.serial
+class TestOpenAIThrottling:
+    """Test concurrency and rate limiting of model calls."""
+    
+    @patch('app.get_openai_client')
+    def test_concurrent_calls_limited_by_semaphore(self, mock_get_client):
+        """Test no more than OPENAI_CONCURRENCY model calls run at once."""
+        in_flight = 0
+        peak = 0
+        
+        async def create(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return _mock_completion("ok")
+        
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = create
+        mock_get_client.return_value = mock_client
+        
+        async def run():
+            with patch('app._openai_semaphore', asyncio.Semaphore(2)):
+                await asyncio.gather(*[
+                    create_completion([{"role": "user", "content": f"question {i}"}])
+                    for i in range(6)
+                ])
+        
+        asyncio.run(run())
+        assert peak == 2
+    
+    @patch('app.get_openai_client')
+    def test_rate_limiter_acquired_per_call(self, mock_get_client, client):
+        """Test each model call takes a token from the rate limiter when configured."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=_mock_completion("ok"))
+        mock_get_client.return_value = mock_client
+        limiter = MagicMock()
+        limiter.acquire = AsyncMock()
+        
+        with patch('app._openai_rate_limiter', limiter):
+            client.post("/chat", json={"message": "Status?"})
+        
+        limiter.acquire.assert_awaited_once()
+
+
+class TestHistoryWindow:
+    """Test the token budget applied to history sent to the model."""
+    
+    # ~100 estimated tokens each
+    TURNS = [
+        {"role": "user", "content": "u" * 384},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": "get_recent_logs", "arguments": "{}"}}
+        ]},
+        {"role": "tool", "tool_call_id": "call_1", "content": "t" * 384},
+        {"role": "assistant", "content": "a" * 384},
+        {"role": "user", "content": "u" * 384},
+    ]
+    
+    def test_history_under_budget_unchanged(self):
+        """Test a conversation within budget is sent whole."""
+        with patch('app.MAX_HISTORY_TOKENS', 1000):
+            assert history_window(self.TURNS) == self.TURNS
+    
+    def test_cuts_at_user_message(self):
+        """Test older turns are dropped whole, never splitting tool results from calls."""
+        with patch('app.MAX_HISTORY_TOKENS', 250):
+            assert history_window(self.TURNS) == self.TURNS[4:]
+    
+    def test_current_turn_always_sent(self):
+        """Test the latest turn is kept even when it alone exceeds the budget."""
+        with patch('app.MAX_HISTORY_TOKENS', 10):
+            assert history_window(self.TURNS) == self.TURNS[4:]
+        with patch('app.MAX_HISTORY_TOKENS', 10):
+            assert history_window(self.TURNS[:4]) == self.TURNS[:4]
+
+
+class TestChatStreamEndpoint:
+    """Test /chat/stream endpoint."""
+    
+    @patch('app.get_openai_client')
+    def test_stream_text_deltas(self, mock_get_client, client):
+        """Test text is streamed as deltas followed by a done event."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=_mock_stream(
+            ("All systems ", None, None),
+            ("are healthy.", None, None),
+            (None, None, "stop"),
+        ))
+        mock_get_client.return_value = mock_client
+        
+        response = client.post("/chat/stream", json={"message": "Status?"})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _sse_events(response)
+        assert [e["type"] for e in events] == ["delta", "delta", "done"]
+        assert events[-1]["response"] == "All systems are healthy."
+        assert events[-1]["conversation_id"]
+        assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+    
+    @patch('app.get_openai_client')
+    def test_stream_assembles_tool_call_fragments(self, mock_get_client, client):
+        """Test tool call arguments split across chunks are reassembled."""
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[
+            _mock_stream(
+                (None, [_mock_tool_call_delta(0, "call_1", "get_system_metrics", '{"resource_name": ')], None),
+                (None, [_mock_tool_call_delta(0, None, None, '"web-app-prod"}')], None),
+                (None, None, "tool_calls"),
+            ),
+            _mock_stream(
+                ("CPU is high.", None, "stop"),
+            ),
+        ])
+        mock_get_client.return_value = mock_client
+        
+        response = client.post("/chat/stream", json={"message": "Why is web-app-prod slow?"})
+        
+        events = _sse_events(response)
+        assert [e["type"] for e in events] == ["tool_call", "tool_result", "delta", "done"]
+        assert events[0]["tool_name"] == "get_system_metrics"
+        assert events[1]["arguments"] == {"resource_name": "web-app-prod"}
+        assert events[-1]["response"] == "CPU is high."
+        assert len(events[-1]["tool_calls"]) == 1
+        
+        # The reassembled call is sent back to the model on the next round
+        second_messages = mock_client.chat.completions.create.call_args_list[1].kwargs["messages"]
+        assert second_messages[2]["tool_calls"][0]["id"] == "call_1"
+        assert second_messages[2]["tool_calls"][0]["function"]["arguments"] == '{"resource_name": "web-app-prod"}'
+    
+    @patch('app.get_openai_client')
+    def test_stream_error_event(self, mock_get_client, client):
+        """Test model errors are reported as an error event."""
+        mock_get_client.side_effect = Exception("API unavailable")
+        
+        response = client.post("/chat/stream", json={"message": "Status?"})
+        
+        assert response.status_code == 200
+        events = _sse_events(response)
+        assert events == [{"type": "error", "detail": "API unavailable"}]
+
+
 class TestToolFunctions:
     """Test TOOL_FUNCTIONS mapping."""
     
@@ -319,7 +870,7 @@ class TestToolFunctions:
 class TestEdgeCases:
     """Test edge cases and error handling."""
     
-    def test_tool_unknown_resource(self):
+    def test_tool_unknown_resource(self, client):
         """Test tool invocation with unknown resource."""
         response = client.post(
             "/tools/get_resource_details",
@@ -334,7 +885,7 @@ class TestEdgeCases:
 class TestContentTypes:
     """Test content type handling."""
     
-    def test_json_content_type(self):
+    def test_json_content_type(self, client):
         """Test endpoint accepts JSON content type."""
         response = client.post(
             "/tools/get_system_config",
@@ -343,16 +894,56 @@ class TestContentTypes:
         )
         assert response.status_code == 200
     
-    def test_response_is_json(self):
+    def test_response_is_json(self, client):
         """Test response is JSON."""
         response = client.get("/health")
         assert response.headers["content-type"] == "application/json"
+    
+    def test_json_routes_declare_response_model(self):
+        """Test JSON routes have a response model, for pydantic-core serialization."""
+        from fastapi.routing import APIRoute
+        # /tools returns pre-serialized bytes, /chat/stream is an event stream
+        raw_paths = {"/tools", "/chat/stream"}
+        for route in app.routes:
+            if isinstance(route, APIRoute) and route.path not in raw_paths:
+                assert route.response_model is not None, route.path
 
 
 class TestConversationEndpoint:
     """Test /conversations/{id} endpoint."""
     
-    def test_delete_nonexistent_conversation(self):
+    def test_delete_nonexistent_conversation(self, client):
         """Test deleting nonexistent conversation returns 404."""
         response = client.delete("/conversations/nonexistent-id")
         assert response.status_code == 404
+    
+    @patch('app.get_openai_client')
+    def test_follow_up_and_delete_conversation(self, mock_get_client, client):
+        """Test follow-ups see prior history and conversations can be deleted."""
+        mock_message = MagicMock()
+        mock_message.content = "Looking into it."
+        mock_message.tool_calls = None
+        
+        mock_choice = MagicMock()
+        mock_choice.message = mock_message
+        mock_choice.finish_reason = "stop"
+        
+        mock_response = MagicMock()
+        mock_response.choices = [mock_choice]
+        
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_get_client.return_value = mock_client
+        
+        first = client.post("/chat", json={"message": "Check api-gateway errors"})
+        conversation_id = first.json()["conversation_id"]
+        client.post("/chat", json={"message": "Any recent changes?", "conversation_id": conversation_id})
+        
+        # The follow-up was sent with the first exchange ahead of it
+        sent = mock_client.chat.completions.create.call_args.kwargs["messages"]
+        assert [m["role"] for m in sent] == ["system", "user", "assistant", "user"]
+        assert sent[3]["content"] == "Any recent changes?"
+        
+        response = client.delete(f"/conversations/{conversation_id}")
+        assert response.status_code == 200
+        assert client.delete(f"/conversations/{conversation_id}").status_code == 404
@@ -0,0 +1,280 @@
+# Conversation Store Unit Tests
+# Run with: pytest tests/ -v
+
+import pytest
+import asyncio
+import msgpack
+from unittest.mock import AsyncMock, patch
+
+from conversation_store import InMemoryConversationStore, RedisConversationStore, COMPRESS_MIN_BYTES
+
+
+MESSAGES = [
+    {"role": "system", "content": "You are an IT admin agent."},
+    {"role": "user", "content": "Check web-app-prod"},
+]
+
+
+class TestInMemoryConversationStore:
+    """Test the process-local conversation store."""
+    
+    def test_missing_conversation(self):
+        """Test unknown conversation returns None."""
+        store = InMemoryConversationStore()
+        assert asyncio.run(store.get("missing")) is None
+    
+    def test_set_and_get(self):
+        """Test stored messages are returned."""
+        store = InMemoryConversationStore()
+        asyncio.run(store.set("conv_1", MESSAGES))
+        assert asyncio.run(store.get("conv_1")) == MESSAGES
+    
+    def test_get_returns_copy(self):
+        """Test appending to a loaded history doesn't change the stored one."""
+        store = InMemoryConversationStore()
+        asyncio.run(store.set("conv_1", MESSAGES))
+        history = asyncio.run(store.get("conv_1"))
+        history.append({"role": "assistant", "content": "Looking into it."})
+        assert asyncio.run(store.get("conv_1")) == MESSAGES
+    
+    def test_append(self):
+        """Test append extends the stored history, creating it if needed."""
+        store = InMemoryConversationStore()
+        asyncio.run(store.append("conv_1", MESSAGES[:1]))
+        asyncio.run(store.append("conv_1", MESSAGES[1:]))
+        assert asyncio.run(store.get("conv_1")) == MESSAGES
+    
+    def test_delete(self):
+        """Test delete reports whether the conversation existed."""
+        store = InMemoryConversationStore()
+        asyncio.run(store.set("conv_1", MESSAGES))
+        assert asyncio.run(store.delete("conv_1")) is True
+        assert asyncio.run(store.delete("conv_1")) is False
+        assert asyncio.run(store.get("conv_1")) is None
+
+
+    def test_bounded_by_max_conversations(self):
+        """Test least recently used conversations are evicted when full."""
+        store = InMemoryConversationStore(max_conversations=2)
+        for conversation_id in ("conv_1", "conv_2", "conv_3"):
+            asyncio.run(store.set(conversation_id, MESSAGES))
+        assert asyncio.run(store.get("conv_1")) is None
+        assert asyncio.run(store.get("conv_3")) == MESSAGES
+        assert store.evictions == 1
+    
+    def test_conversations_expire(self):
+        """Test conversations expire after the TTL."""
+        now = [1000.0]
+        store = InMemoryConversationStore(ttl=60, timer=lambda: now[0])
+        asyncio.run(store.set("conv_1", MESSAGES))
+        now[0] += 59
+        assert asyncio.run(store.get("conv_1")) == MESSAGES
+        now[0] += 2
+        assert asyncio.run(store.get("conv_1")) is None
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the store: lists, strings and
+    transactional pipelines over one shared dict. TTLs are recorded, not
+    enforced; expire_now() stands in for a key lapsing."""
+    
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.executed = []  # commands per executed pipeline
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    def expire_now(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+    
+    def _run(self, command, *args, **kwargs):
+        if command == "get":
+            value = self.data.get(args[0])
+            return value.encode() if value is not None else None
+        if command == "set":
+            key, value = args
+            if kwargs.get("nx") and key in self.data:
+                return None
+            self.data[key] = value
+            if kwargs.get("ex"):
+                self.ttls[key] = kwargs["ex"]
+            return True
+        if command == "delete":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if command == "rpush":
+            entries = self.data.setdefault(args[0], [])
+            entries.extend(args[1:])
+            return len(entries)
+        if command == "lrange":
+            key, start, end = args
+            entries = self.data.get(key, [])
+            return list(entries[start:] if end == -1 else entries[start:end + 1])
+        if command == "expire":
+            self.ttls[args[0]] = args[1]
+            return args[0] in self.data
+        raise NotImplementedError(command)
+    
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+    
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: self._commands.append((command, args, kwargs))
+    
+    async def execute(self):
+        self._client.executed.append([c for c, _, _ in self._commands])
+        return [self._client._run(c, *args, **kwargs) for c, args, kwargs in self._commands]
+
+
+class TestRedisConversationStore:
+    """Test the Redis conversation store against an in-memory fake client."""
+    
+    KEY = "conv:messages:conv_1"
+    
+    def test_set_replaces_list_with_ttl(self):
+        """Test set rewrites the prefixed list, one msgpack entry per message."""
+        client = FakeRedis()
+        store = RedisConversationStore(client, ttl=600)
+        asyncio.run(store.set("conv_1", MESSAGES[:1]))
+        asyncio.run(store.set("conv_1", MESSAGES))
+        assert client.data[self.KEY] == [msgpack.packb(m) for m in MESSAGES]
+        assert client.ttls[self.KEY] == 600
+        assert client.ttls["conv:generation:conv_1"] == 600
+    
+    def test_append_pushes_only_new_messages(self):
+        """Test append pushes the given messages and refreshes the TTL."""
+        client = FakeRedis()
+        store = RedisConversationStore(client, ttl=600)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        reply = {"role": "assistant", "content": "Looking into it."}
+        asyncio.run(store.append("conv_1", [reply]))
+        assert "delete" not in client.executed[-1]
+        assert client.data[self.KEY] == [msgpack.packb(m) for m in MESSAGES + [reply]]
+        assert client.ttls[self.KEY] == 600
+        
+        executed = len(client.executed)
+        asyncio.run(store.append("conv_1", []))
+        assert len(client.executed) == executed
+    
+    def test_get_decodes_messages(self):
+        """Test stored entries are decoded back to messages."""
+        client = FakeRedis()
+        client.data[self.KEY] = [msgpack.packb(m) for m in MESSAGES]
+        store = RedisConversationStore(client)
+        assert asyncio.run(store.get("conv_1")) == MESSAGES
+    
+    def test_large_messages_compressed(self):
+        """Test large messages are stored compressed and read back intact."""
+        client = FakeRedis()
+        store = RedisConversationStore(client)
+        tool_result = {"role": "tool", "tool_call_id": "call_1", "content": '{"status": "healthy"}' * COMPRESS_MIN_BYTES}
+        asyncio.run(store.append("conv_1", [tool_result, MESSAGES[1]]))
+        
+        stored = client.data[self.KEY]
+        assert len(stored[0]) < len(msgpack.packb(tool_result))
+        assert stored[1] == msgpack.packb(MESSAGES[1])
+        
+        assert asyncio.run(RedisConversationStore(client).get("conv_1")) == [tool_result, MESSAGES[1]]
+    
+    def test_get_missing(self):
+        """Test a missing key returns None."""
+        store = RedisConversationStore(FakeRedis())
+        assert asyncio.run(store.get("conv_1")) is None
+    
+    def test_repeat_get_fetches_only_new_entries(self):
+        """Test a cached history is topped up with entries appended elsewhere."""
+        reply = {"role": "assistant", "content": "Looking into it."}
+        client = FakeRedis()
+        store, other = RedisConversationStore(client), RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        
+        asyncio.run(store.get("conv_1"))
+        asyncio.run(other.append("conv_1", [reply]))
+        decoded = []
+        with patch("conversation_store._decode_message", side_effect=lambda m: decoded.append(m) or msgpack.unpackb(m)):
+            assert asyncio.run(store.get("conv_1")) == MESSAGES + [reply]
+        assert decoded == [msgpack.packb(reply)]
+    
+    def test_own_append_extends_local_copy(self):
+        """Test a worker's own append doesn't force a full re-read."""
+        reply = {"role": "assistant", "content": "Looking into it."}
+        client = FakeRedis()
+        store = RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        asyncio.run(store.get("conv_1"))
+        asyncio.run(store.append("conv_1", [reply]))
+        with patch("conversation_store._decode_message") as decode:
+            assert asyncio.run(store.get("conv_1")) == MESSAGES + [reply]
+        decode.assert_not_called()
+    
+    def test_repeat_get_rereads_shrunk_list(self):
+        """Test a list shorter than the cached history is read in full."""
+        client = FakeRedis()
+        store = RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        asyncio.run(store.get("conv_1"))
+        asyncio.run(RedisConversationStore(client).set("conv_1", MESSAGES[:1]))
+        assert asyncio.run(store.get("conv_1")) == MESSAGES[:1]
+    
+    def test_get_after_delete_and_longer_append_elsewhere(self):
+        """Test a history deleted and rebuilt at least as long by another worker isn't mixed with the stale copy."""
+        client = FakeRedis()
+        store, other = RedisConversationStore(client), RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        asyncio.run(store.get("conv_1"))
+        
+        rebuilt = [{"role": "user", "content": f"Message {i}"} for i in range(len(MESSAGES) + 1)]
+        asyncio.run(other.delete("conv_1"))
+        asyncio.run(other.append("conv_1", rebuilt))
+        assert asyncio.run(store.get("conv_1")) == rebuilt
+    
+    def test_get_after_set_elsewhere(self):
+        """Test a history replaced by another worker's set() is read in full."""
+        client = FakeRedis()
+        store, other = RedisConversationStore(client), RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        asyncio.run(store.get("conv_1"))
+        
+        replaced = [{"role": "user", "content": f"Message {i}"} for i in range(len(MESSAGES) + 1)]
+        asyncio.run(other.set("conv_1", replaced))
+        assert asyncio.run(store.get("conv_1")) == replaced
+    
+    def test_get_after_expiry_and_recreate(self):
+        """Test a local copy doesn't outlive the Redis key it mirrors."""
+        client = FakeRedis()
+        store = RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        asyncio.run(store.get("conv_1"))
+        
+        client.expire_now(self.KEY, "conv:generation:conv_1")
+        assert asyncio.run(store.get("conv_1")) is None
+        asyncio.run(store.set("conv_1", MESSAGES))
+        asyncio.run(store.get("conv_1"))
+        client.expire_now(self.KEY, "conv:generation:conv_1")
+        rebuilt = [{"role": "user", "content": f"Message {i}"} for i in range(len(MESSAGES))]
+        asyncio.run(RedisConversationStore(client).append("conv_1", rebuilt))
+        assert asyncio.run(store.get("conv_1")) == rebuilt
+    
+    def test_delete(self):
+        """Test delete maps the deleted-key count to a bool."""
+        client = FakeRedis()
+        store = RedisConversationStore(client)
+        asyncio.run(store.set("conv_1", MESSAGES))
+        assert asyncio.run(store.delete("conv_1")) is True
+        assert asyncio.run(store.delete("conv_1")) is False
+        assert client.data == {}
+    
+    def test_close(self):
+        """Test close releases the client's connection pool."""
+        client = AsyncMock()
+        store = RedisConversationStore(client)
+        asyncio.run(store.close())
+        client.aclose.assert_awaited_once()
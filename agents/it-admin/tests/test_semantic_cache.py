@@ -0,0 +1,138 @@
+# Semantic Cache Unit Tests
+# Run with: pytest tests/ -v
+
+import time
+import pytest
+import numpy as np
+
+from semantic_cache import SemanticCache, normalize
+
+
+class TestNormalize:
+    """Test embedding normalization."""
+    
+    def test_unit_length(self):
+        """Test normalized vectors have unit length."""
+        v = normalize([3.0, 4.0])
+        assert np.isclose(np.linalg.norm(v), 1.0)
+    
+    def test_zero_vector(self):
+        """Test zero vector is returned unchanged."""
+        v = normalize([0.0, 0.0])
+        assert not v.any()
+
+
+class TestSemanticCache:
+    """Test SemanticCache lookup, eviction and persistence."""
+    
+    def test_empty_cache_misses(self):
+        """Test lookup on empty cache returns None."""
+        cache = SemanticCache()
+        assert cache.lookup([1.0, 0.0]) is None
+    
+    def test_similar_embedding_hits(self):
+        """Test a near-identical embedding returns the stored entry."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], {"response": "cpu is high"})
+        assert cache.lookup([0.99, 0.05, 0.0]) == {"response": "cpu is high"}
+    
+    def test_dissimilar_embedding_misses(self):
+        """Test an unrelated embedding does not hit."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0], {"response": "cpu is high"})
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+    
+    def test_returns_nearest_entry(self):
+        """Test the most similar entry wins."""
+        cache = SemanticCache(threshold=0.5)
+        cache.add([1.0, 0.0], {"response": "a"})
+        cache.add([0.0, 1.0], {"response": "b"})
+        assert cache.lookup([0.2, 0.9])["response"] == "b"
+    
+    def test_oldest_entry_evicted(self):
+        """Test max_entries bounds the cache."""
+        cache = SemanticCache(threshold=0.9, max_entries=2)
+        cache.add([1.0, 0.0, 0.0], {"response": "a"})
+        cache.add([0.0, 1.0, 0.0], {"response": "b"})
+        cache.add([0.0, 0.0, 1.0], {"response": "c"})
+        assert len(cache) == 2
+        assert cache.lookup([1.0, 0.0, 0.0]) is None
+        assert cache.lookup([0.0, 0.0, 1.0])["response"] == "c"
+    
+    def test_save_after_eviction_keeps_newest(self, tmp_path):
+        """Test a cache that has wrapped around saves and reloads its newest entries."""
+        path = str(tmp_path / "cache.npz")
+        cache = SemanticCache(threshold=0.9, max_entries=2)
+        for i, response in enumerate("abc"):
+            cache.add(np.eye(3)[i], {"response": response})
+        cache.save(path)
+        
+        restored = SemanticCache(threshold=0.9, max_entries=1)
+        restored.load(path)
+        assert len(restored) == 1
+        assert restored.lookup([0.0, 0.0, 1.0]) == {"response": "c"}
+    
+    def test_expired_entry_misses(self, monkeypatch):
+        """Test entries older than the ttl no longer match."""
+        cache = SemanticCache(threshold=0.9, ttl=60)
+        cache.add([1.0, 0.0], {"response": "a"})
+        assert cache.lookup([1.0, 0.0]) == {"response": "a"}
+        
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        assert cache.lookup([1.0, 0.0]) is None
+    
+    def test_save_and_load(self, tmp_path):
+        """Test cache round-trips through an .npz file."""
+        path = str(tmp_path / "cache.npz")
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], {"response": "a", "tool_calls": []})
+        cache.save(path)
+        
+        restored = SemanticCache(threshold=0.9)
+        restored.load(path)
+        assert len(restored) == 1
+        assert restored.lookup([1.0, 0.0]) == {"response": "a", "tool_calls": []}
+    
+    def test_load_keeps_entry_age(self, tmp_path, monkeypatch):
+        """Test restored entries keep the time they were first added."""
+        path = str(tmp_path / "cache.npz")
+        cache = SemanticCache(threshold=0.9, ttl=60)
+        cache.add([1.0, 0.0], {"response": "a"})
+        cache.save(path)
+        
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+        restored = SemanticCache(threshold=0.9, ttl=60)
+        restored.load(path)
+        assert restored.lookup([1.0, 0.0]) is None
+    
+    def test_dimension_change_misses_and_drops_entries(self):
+        """Test a query from a different embedding model misses and clears stale rows."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0, 0.0, 0.0], {"response": "a"})
+        assert cache.lookup([1.0] + [0.0] * 7) is None
+        assert len(cache) == 0
+        cache.add([1.0] + [0.0] * 7, {"response": "b"})
+        assert cache.lookup([1.0] + [0.0] * 7)["response"] == "b"
+    
+    def test_add_with_wrong_dimension_is_noop(self):
+        """Test adding an embedding of another dimension leaves the cache intact."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], {"response": "a"})
+        cache.add([1.0, 0.0, 0.0], {"response": "b"})
+        assert len(cache) == 1
+        assert cache.lookup([1.0, 0.0])["response"] == "a"
+    
+    def test_load_ignores_file_with_other_dimension(self, tmp_path):
+        """Test a saved cache of another dimension is not loaded over live entries."""
+        path = str(tmp_path / "cache.npz")
+        old = SemanticCache(threshold=0.9)
+        old.add([1.0, 0.0, 0.0, 0.0], {"response": "old"})
+        old.save(path)
+        
+        cache = SemanticCache(threshold=0.9)
+        cache.add([1.0, 0.0], {"response": "new"})
+        cache.load(path)
+        assert len(cache) == 1
+        assert cache.lookup([1.0, 0.0])["response"] == "new"
@@ -1,15 +1,16 @@
 # IT Admin Agent Unit Tests
 # Run with: pytest tests/ -v
 
+import re
+import orjson
 import pytest
-import sys
-import json
+from dataclasses import dataclass
 from datetime import datetime
-from unittest.mock import patch, MagicMock
-
-# Add parent directory to path for imports
-sys.path.insert(0, '.')
+from itertools import pairwise
+from operator import itemgetter
+from jsonschema import Draft7Validator
 
+import tools
 from tools import (
     TOOL_DEFINITIONS,
     MOCK_RESOURCES,
@@ -20,8 +21,50 @@ from tools import (
     get_recent_changes,
     check_dependencies,
     get_resource_details,
+    dispatch_many,
+    TOOL_FUNCTIONS,
 )
 
+@dataclass(frozen=True, slots=True)
+class SimulatedIssueThresholds:
+    """Minimum metric values the mock data uses for simulated issues."""
+    cpu_percent: int = 75
+    latency_p50_ms: int = 500
+
+
+THRESHOLDS = SimulatedIssueThresholds()
+
+# /subscriptions/{id}/resourceGroups/{rg}/providers/{namespace}/{type}/{name}
+_ARM_ID_RE = re.compile(r"^/subscriptions/[^/]+/resourceGroups/[^/]+/providers/[^/]+/[^/]+/[^/]+$")
+
+# Shape of an OpenAI function calling tool definition
+_TOOL_DEFINITION_VALIDATOR = Draft7Validator({
+    "type": "object",
+    "required": ["type", "function"],
+    "properties": {
+        "type": {"const": "function"},
+        "function": {
+            "type": "object",
+            "required": ["name", "description", "parameters"],
+            "properties": {
+                "name": {"type": "string"},
+                "description": {"type": "string"},
+                "parameters": {
+                    "type": "object",
+                    "required": ["type"],
+                    "properties": {"type": {"const": "object"}}
+                }
+            }
+        }
+    }
+})
+
+# One compiled validator per tool, reused by every test that checks arguments
+_VALIDATORS = {
+    t["function"]["name"]: Draft7Validator(t["function"]["parameters"])
+    for t in TOOL_DEFINITIONS
+}
+
 
 class TestToolDefinitions:
     """Test tool definitions are properly structured for OpenAI function calling."""
@@ -32,29 +75,81 @@ class TestToolDefinitions:
     
     def test_tool_definitions_structure(self):
         """Verify each tool has required OpenAI function calling structure."""
-        for tool in TOOL_DEFINITIONS:
-            assert "type" in tool
-            assert tool["type"] == "function"
-            assert "function" in tool
-            assert "name" in tool["function"]
-            assert "description" in tool["function"]
-            assert "parameters" in tool["function"]
-            assert "type" in tool["function"]["parameters"]
-            assert tool["function"]["parameters"]["type"] == "object"
-    
-    def test_tool_names_unique(self):
+        errors = [
+            f"{tool.get('function', {}).get('name', i)}: {error.message}"
+            for i, tool in enumerate(TOOL_DEFINITIONS)
+            for error in _TOOL_DEFINITION_VALIDATOR.iter_errors(tool)
+        ]
+        assert not errors, "\n".join(errors)
+    
+    def test_tool_names_unique(self, tool_index):
         """Verify all tool names are unique."""
-        names = [t["function"]["name"] for t in TOOL_DEFINITIONS]
+        names = tool_index["names"]
         assert len(names) == len(set(names))
     
-    def test_required_parameters_defined(self):
+    def test_required_parameters_defined(self, tool_index):
         """Verify required parameters are defined in properties."""
-        for tool in TOOL_DEFINITIONS:
-            params = tool["function"]["parameters"]
-            if "required" in params:
-                for req in params["required"]:
-                    assert req in params["properties"], \
-                        f"Required param '{req}' not in properties for {tool['function']['name']}"
+        for name, params in tool_index["required"]:
+            for req in params["required"]:
+                assert req in params["properties"], \
+                    f"Required param '{req}' not in properties for {name}"
+
+    def test_parameter_schemas_valid(self, tool_index):
+        """Verify each tool's parameters are a valid JSON Schema."""
+        for params in tool_index["parameters"]:
+            Draft7Validator.check_schema(params)
+    
+    def test_sample_arguments_match_schema(self, sample_tool_arguments):
+        """Verify sample arguments validate against each tool's schema."""
+        assert set(sample_tool_arguments) == set(_VALIDATORS)
+        for name, arguments in sample_tool_arguments.items():
+            _VALIDATORS[name].validate(arguments)
+    
+    def test_tool_results_serialize(self, sample_tool_arguments):
+        """Verify every tool result serializes the way the agent sends it back."""
+        results = dispatch_many(list(sample_tool_arguments.items()))
+        for name, result in zip(sample_tool_arguments, results):
+            assert orjson.loads(orjson.dumps(result)) == result, name
+    
+    def test_missing_required_argument_rejected(self):
+        """Verify the schema rejects calls without required arguments."""
+        errors = list(_VALIDATORS["get_system_metrics"].iter_errors({}))
+        assert any(e.validator == "required" for e in errors)
+
+
+class TestLoadMockData:
+    """Test loading mock data files."""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_mock_cache(self):
+        """Drop cached files so each test reads its own directory."""
+        tools.clear_mock_cache()
+        yield
+        tools.clear_mock_cache()
+    
+    def test_loads_json_file(self, tmp_path, monkeypatch):
+        """Test a mock data file is parsed into a dict."""
+        (tmp_path / "resources.json").write_bytes(b'{"web-app-prod": {"type": "container_app"}}')
+        monkeypatch.setattr(tools, "MOCK_DATA_DIR", tmp_path)
+        assert tools._load_mock_data("resources.json") == {"web-app-prod": {"type": "container_app"}}
+    
+    def test_file_parsed_once(self, tmp_path, monkeypatch):
+        """Test repeated loads are served from the cache until it is cleared."""
+        path = tmp_path / "resources.json"
+        path.write_bytes(b'{"version": 1}')
+        monkeypatch.setattr(tools, "MOCK_DATA_DIR", tmp_path)
+        assert tools._load_mock_data("resources.json") == {"version": 1}
+        
+        path.write_bytes(b'{"version": 2}')
+        assert tools._load_mock_data("resources.json") == {"version": 1}
+        
+        tools.clear_mock_cache()
+        assert tools._load_mock_data("resources.json") == {"version": 2}
+    
+    def test_missing_file_returns_empty(self, tmp_path, monkeypatch):
+        """Test a missing mock data file returns an empty dict."""
+        monkeypatch.setattr(tools, "MOCK_DATA_DIR", tmp_path)
+        assert tools._load_mock_data("missing.json") == {}
 
 
 class TestMockResources:
@@ -72,12 +167,25 @@ class TestMockResources:
         assert "config" in resource
         assert "dependencies" in resource
     
+    def test_mock_resources_read_only(self):
+        """Verify MOCK_RESOURCES can't be modified at runtime."""
+        with pytest.raises(TypeError):
+            MOCK_RESOURCES["new-resource"] = {}
+    
     def test_mock_resources_have_dependencies(self):
         """Verify all mock resources have dependency definitions."""
         for name, resource in MOCK_RESOURCES.items():
             assert "dependencies" in resource, f"Missing dependencies for {name}"
             assert "upstream" in resource["dependencies"]
             assert "downstream" in resource["dependencies"]
+    
+    def test_mock_dependencies_are_symmetric(self, mock_resource_index):
+        """Verify known upstream dependencies list the resource downstream."""
+        for name, resource in mock_resource_index.items():
+            for upstream in resource.upstream:
+                if upstream in mock_resource_index:
+                    assert name in mock_resource_index[upstream].downstream, \
+                        f"{upstream} does not list {name} downstream"
 
 
 class TestGetSystemConfig:
@@ -98,12 +206,27 @@ class TestGetSystemConfig:
         assert "configuration" in result
         assert result["configuration"]["status"] == "running"
     
-    def test_all_mock_resources(self):
+    def test_returns_copy(self):
+        """Test callers modifying a result don't change later results."""
+        result = get_system_config("web-app-prod", "container_app")
+        result["resource_type"] = "modified"
+        assert get_system_config("web-app-prod", "container_app")["resource_type"] == "container_app"
+    
+    def test_unknown_resource_nested_values_not_shared(self):
+        """Test modifying an unknown-resource config doesn't change later results."""
+        result = get_system_config("unknown-resource", "container_app")
+        result["configuration"]["status"] = "modified"
+        result["tags"]["owner"] = "someone"
+        fresh = get_system_config("other-resource", "container_app")
+        assert fresh["configuration"]["status"] == "running"
+        assert fresh["tags"] == {"environment": "production"}
+    
+    @pytest.mark.parametrize("resource_name", list(MOCK_RESOURCES))
+    def test_all_mock_resources(self, resource_name):
         """Test all mock resources return valid config."""
-        for resource_name in MOCK_RESOURCES:
-            result = get_system_config(resource_name, "any")
-            assert result["resource_name"] == resource_name
-            assert "configuration" in result
+        result = get_system_config(resource_name, "any")
+        assert result["resource_name"] == resource_name
+        assert "configuration" in result
 
 
 class TestGetSystemMetrics:
@@ -126,49 +249,70 @@ class TestGetSystemMetrics:
         assert "requests" in result["data"]
         assert "errors" in result["data"]
     
-    def test_web_app_prod_has_high_cpu(self):
-        """Test web-app-prod shows high CPU (simulated issue)."""
-        result = get_system_metrics("web-app-prod", "cpu", "1h")
+    @pytest.mark.parametrize("resource_name, metric, field, threshold, statuses", [
         # CPU should be ~85% (simulated issue)
-        assert result["data"]["cpu"]["current_percent"] >= 75
-        assert result["data"]["cpu"]["status"] in ["warning", "critical"]
-    
-    def test_sql_db_has_high_latency(self):
-        """Test sql-db-main shows high latency (simulated issue)."""
-        result = get_system_metrics("sql-db-main", "latency", "1h")
+        ("web-app-prod", "cpu", "current_percent", THRESHOLDS.cpu_percent, ["warning", "critical"]),
         # Latency should be >500ms (simulated issue)
-        assert result["data"]["latency"]["p50_ms"] >= 500
-        assert result["data"]["latency"]["status"] == "critical"
+        ("sql-db-main", "latency", "p50_ms", THRESHOLDS.latency_p50_ms, ["critical"]),
+    ], ids=["web-app-prod-high-cpu", "sql-db-main-high-latency"])
+    def test_simulated_issue_exceeds_threshold(self, resource_name, metric, field, threshold, statuses):
+        """Test resources with simulated issues report metrics above threshold."""
+        result = get_system_metrics(resource_name, metric, "1h")
+        assert result["data"][metric][field] >= threshold
+        assert result["data"][metric]["status"] in statuses
+    
+    def test_seeded_metrics_reproducible(self):
+        """Test seeding the tools' random source reproduces the metrics."""
+        tools._rng.seed(42)
+        first = get_system_metrics("api-gateway", "all", "1h")["data"]
+        tools._rng.seed(42)
+        assert get_system_metrics("api-gateway", "all", "1h")["data"] == first
     
     def test_time_range_included(self):
         """Test time range is included in response."""
         result = get_system_metrics("web-app-prod", "cpu", "24h")
         assert result["time_range"] == "24h"
+    
+    @pytest.mark.parametrize("resource_name", list(MOCK_RESOURCES))
+    def test_all_mock_resources(self, resource_name):
+        """Test all mock resources return every metric."""
+        result = get_system_metrics(resource_name, "all", "1h")
+        assert result["resource"] == resource_name
+        assert set(result["data"]) == {"cpu", "memory", "latency", "requests", "errors"}
+
+
+@pytest.fixture(scope="module")
+def web_app_logs_all():
+    """Logs of every severity for web-app-prod, generated once per module."""
+    return get_recent_logs("web-app-prod", "all", 20)
+
+
+@pytest.fixture(scope="module")
+def web_app_logs_error():
+    """Error logs for web-app-prod, generated once per module."""
+    return get_recent_logs("web-app-prod", "error", 20)
 
 
 class TestGetRecentLogs:
     """Test get_recent_logs tool function."""
     
-    def test_returns_logs(self):
+    def test_returns_logs(self, web_app_logs_all):
         """Test logs are returned."""
-        result = get_recent_logs("web-app-prod", "all", 20)
-        assert "logs" in result
-        assert "count" in result
-        assert len(result["logs"]) > 0
+        assert "logs" in web_app_logs_all
+        assert "count" in web_app_logs_all
+        assert len(web_app_logs_all["logs"]) > 0
     
-    def test_log_structure(self):
+    def test_log_structure(self, web_app_logs_all):
         """Test log entries have required structure."""
-        result = get_recent_logs("web-app-prod", "all", 10)
-        for log in result["logs"]:
+        for log in web_app_logs_all["logs"]:
             assert "timestamp" in log
             assert "severity" in log
             assert "message" in log
             assert "source" in log
     
-    def test_error_filter(self):
+    def test_error_filter(self, web_app_logs_error):
         """Test error severity filter."""
-        result = get_recent_logs("web-app-prod", "error", 20)
-        for log in result["logs"]:
+        for log in web_app_logs_error["logs"]:
             assert log["severity"] == "error"
     
     def test_limit_respected(self):
@@ -176,11 +320,15 @@ class TestGetRecentLogs:
         result = get_recent_logs("web-app-prod", "all", 5)
         assert len(result["logs"]) <= 5
     
-    def test_logs_sorted_by_time(self):
+    def test_logs_sorted_by_time(self, web_app_logs_all):
         """Test logs are sorted by timestamp (most recent first)."""
-        result = get_recent_logs("web-app-prod", "all", 10)
-        timestamps = [log["timestamp"] for log in result["logs"]]
-        assert timestamps == sorted(timestamps, reverse=True)
+        timestamps = map(itemgetter("timestamp"), web_app_logs_all["logs"])
+        assert all(newer >= older for newer, older in pairwise(timestamps))
+    
+    def test_timestamps_are_whole_minutes_apart(self, web_app_logs_all):
+        """Test timestamps are ISO 8601 and differ only by whole minutes."""
+        timestamps = [datetime.fromisoformat(log["timestamp"]) for log in web_app_logs_all["logs"]]
+        assert all((newer - older).total_seconds() % 60 == 0 for newer, older in pairwise(timestamps))
 
 
 class TestGetServiceHealth:
@@ -192,13 +340,25 @@ class TestGetServiceHealth:
         assert result["status"] == "healthy"
         assert result["active_incidents"] == []
     
-    def test_azure_sql_eastus_degraded(self):
+    def test_azure_sql_eastus_degraded(self, cached_tools):
         """Test Azure SQL in eastus shows degraded status (simulated incident)."""
-        result = get_service_health("Azure SQL", "eastus")
+        result = cached_tools.get_service_health("Azure SQL", "eastus")
         assert result["status"] == "degraded"
         assert len(result["active_incidents"]) > 0
         assert "incident_id" in result["active_incidents"][0]
     
+    def test_incident_timestamps_shared_within_ttl(self, monkeypatch):
+        """Test calls in the same tick reuse the formatted timestamps."""
+        first = get_service_health("Azure SQL", "eastus")["active_incidents"][0]
+        second = get_service_health("Azure SQL", "eastus")["active_incidents"][0]
+        assert second["start_time"] is first["start_time"]
+        
+        # Once expired, timestamps are recomputed
+        monkeypatch.setitem(tools._timestamp_cache, "expires", 0.0)
+        third = get_service_health("Azure SQL", "eastus")["active_incidents"][0]
+        assert third["start_time"] is not first["start_time"]
+        assert third["start_time"] >= first["start_time"]
+    
     def test_service_and_region_in_response(self):
         """Test service and region are included in response."""
         result = get_service_health("Storage", "westus2")
@@ -234,9 +394,9 @@ class TestGetRecentChanges:
 class TestCheckDependencies:
     """Test check_dependencies tool function."""
     
-    def test_known_resource_dependencies(self):
+    def test_known_resource_dependencies(self, cached_tools):
         """Test dependencies for known resource."""
-        result = check_dependencies("web-app-prod")
+        result = cached_tools.check_dependencies("web-app-prod")
         assert "upstream_dependencies" in result
         assert "downstream_dependencies" in result
         assert len(result["upstream_dependencies"]) > 0
@@ -248,9 +408,18 @@ class TestCheckDependencies:
         assert result["upstream_dependencies"] == []
         assert result["downstream_dependencies"] == []
     
-    def test_dependency_counts(self):
+    def test_unknown_resource_lists_not_shared(self):
+        """Test modifying unknown-resource dependency lists doesn't change later results."""
+        result = check_dependencies("unknown-resource")
+        result["upstream_dependencies"].append("sql-db-main")
+        result["downstream_dependencies"].append("web-app-prod")
+        fresh = check_dependencies("other-resource")
+        assert fresh["upstream_dependencies"] == []
+        assert fresh["downstream_dependencies"] == []
+    
+    def test_dependency_counts(self, cached_tools):
         """Test dependency counts are correct."""
-        result = check_dependencies("web-app-prod")
+        result = cached_tools.check_dependencies("web-app-prod")
         assert result["upstream_count"] == len(result["upstream_dependencies"])
         assert result["downstream_count"] == len(result["downstream_dependencies"])
 
@@ -258,9 +427,9 @@ class TestCheckDependencies:
 class TestGetResourceDetails:
     """Test get_resource_details tool function."""
     
-    def test_known_resource_details(self):
+    def test_known_resource_details(self, cached_tools):
         """Test details for known resource."""
-        result = get_resource_details("web-app-prod")
+        result = cached_tools.get_resource_details("web-app-prod")
         assert result["resource_name"] == "web-app-prod"
         assert result["resource_type"] == "container_app"
         assert result["resource_group"] == "rg-production"
@@ -273,11 +442,10 @@ class TestGetResourceDetails:
         assert "error" in result
         assert "suggestion" in result
     
-    def test_resource_id_format(self):
+    def test_resource_id_format(self, cached_tools):
         """Test resource ID has correct ARM format."""
-        result = get_resource_details("web-app-prod")
-        assert result["resource_id"].startswith("/subscriptions/")
-        assert "/resourceGroups/" in result["resource_id"]
+        result = cached_tools.get_resource_details("web-app-prod")
+        assert _ARM_ID_RE.match(result["resource_id"]), result["resource_id"]
 
 
 class TestToolFunctionExports:
@@ -285,30 +453,14 @@ class TestToolFunctionExports:
     
     def test_all_tool_functions_exist(self):
         """Verify all defined tools have corresponding functions."""
-        from tools import (
-            get_system_config,
-            get_system_metrics,
-            get_recent_logs,
-            get_service_health,
-            get_recent_changes,
-            check_dependencies,
-            get_resource_details,
-        )
-        
-        tool_name_to_function = {
-            "get_system_config": get_system_config,
-            "get_system_metrics": get_system_metrics,
-            "get_recent_logs": get_recent_logs,
-            "get_service_health": get_service_health,
-            "get_recent_changes": get_recent_changes,
-            "check_dependencies": check_dependencies,
-            "get_resource_details": get_resource_details,
-        }
-        
-        for tool in TOOL_DEFINITIONS:
-            name = tool["function"]["name"]
-            assert name in tool_name_to_function, f"No function exported for tool: {name}"
-            assert callable(tool_name_to_function[name])
+        missing = {t["function"]["name"] for t in TOOL_DEFINITIONS} - TOOL_FUNCTIONS.keys()
+        assert not missing, f"No function registered for tools: {missing}"
+        assert all(callable(f) for f in TOOL_FUNCTIONS.values())
+    
+    def test_registered_functions_are_exported(self):
+        """Verify TOOL_FUNCTIONS maps each name to the function of that name."""
+        for name, function in TOOL_FUNCTIONS.items():
+            assert getattr(tools, name) is function
 
 
 class TestAgenticScenarios:
@@ -316,24 +468,23 @@ class TestAgenticScenarios:
     
     def test_investigate_slow_web_app(self):
         """Simulate investigating a slow web app report."""
-        # Step 1: Get resource details
-        details = get_resource_details("web-app-prod")
-        assert details["resource_type"] == "container_app"
+        details, metrics, deps, sql_metrics, service_health = dispatch_many([
+            # Step 1: Get resource details
+            ("get_resource_details", {"resource_name": "web-app-prod"}),
+            # Step 2: Check metrics
+            ("get_system_metrics", {"resource_name": "web-app-prod", "metric_type": "all", "time_range": "1h"}),
+            # Step 3: Check dependencies
+            ("check_dependencies", {"resource_name": "web-app-prod"}),
+            # Step 4: Check dependency health
+            ("get_system_metrics", {"resource_name": "sql-db-main", "metric_type": "latency", "time_range": "1h"}),
+            # Step 5: Check service health
+            ("get_service_health", {"service": "Azure SQL", "region": "eastus"}),
+        ])
         
-        # Step 2: Check metrics
-        metrics = get_system_metrics("web-app-prod", "all", "1h")
+        assert details["resource_type"] == "container_app"
         assert metrics["data"]["cpu"]["status"] in ["warning", "critical"]
-        
-        # Step 3: Check dependencies
-        deps = check_dependencies("web-app-prod")
         assert "sql-db-main" in deps["upstream_dependencies"]
-        
-        # Step 4: Check dependency health
-        sql_metrics = get_system_metrics("sql-db-main", "latency", "1h")
         assert sql_metrics["data"]["latency"]["status"] == "critical"
-        
-        # Step 5: Check service health
-        service_health = get_service_health("Azure SQL", "eastus")
         assert service_health["status"] == "degraded"
     
     def test_investigate_error_spike(self):
@@ -1,22 +1,41 @@
 # IT Admin Agent Tools
 # Mock implementations that return realistic Azure infrastructure data
 
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import calendar
+import functools
 import random
-import json
+import time
+import orjson
 from pathlib import Path
+from types import MappingProxyType
+
+# Random source for the generated mock data. Bound methods skip the module
+# attribute lookup per draw; call _rng.seed() for reproducible output.
+_rng = random.Random()
+_randint = _rng.randint
+_choices = _rng.choices
 
 # Load mock data from files
 MOCK_DATA_DIR = Path(__file__).parent / "mock_data"
 
+@functools.lru_cache(maxsize=None)
 def _load_mock_data(filename: str) -> Dict[str, Any]:
-    """Load mock data from JSON file."""
-    filepath = MOCK_DATA_DIR / filename
-    if filepath.exists():
-        with open(filepath) as f:
-            return json.load(f)
-    return {}
+    """Load mock data from JSON file.
+
+    Files are parsed once and the result is shared; callers must not mutate it.
+    """
+    try:
+        # orjson parses the UTF-8 bytes directly, without decoding to str first
+        return orjson.loads((MOCK_DATA_DIR / filename).read_bytes())
+    except FileNotFoundError:
+        return {}
+
+
+def clear_mock_cache() -> None:
+    """Forget parsed mock data files, e.g. after they change on disk."""
+    _load_mock_data.cache_clear()
 
 # Tool definitions for OpenAI function calling
 TOOL_DEFINITIONS = [
@@ -182,7 +201,8 @@ TOOL_DEFINITIONS = [
 
 # ============ Mock Data for Various Systems ============
 
-MOCK_RESOURCES = {
+# Read-only at runtime: tool payloads below are precomputed from it
+MOCK_RESOURCES = MappingProxyType({
     "web-app-prod": {
         "type": "container_app",
         "resource_group": "rg-production",
@@ -286,6 +306,37 @@ MOCK_RESOURCES = {
             "downstream": ["web-app-prod", "backup-service", "log-analytics"]
         }
     }
+})
+
+
+# Fixed fields of each metric section, keyed by whether the resource simulates an issue
+_CPU_METRICS = {
+    issue: {
+        "average_percent": base - 5,
+        "max_percent": base + 15,
+        "min_percent": base - 20,
+        "status": "critical" if issue else "healthy"
+    }
+    for issue, base in ((True, 85), (False, 35))
+}
+_MEMORY_METRICS = {
+    issue: {
+        "average_percent": base - 3,
+        "used_gb": round(base * 0.04, 2),
+        "available_gb": round((100 - base) * 0.04, 2),
+        "status": "warning" if issue else "healthy"
+    }
+    for issue, base in ((True, 70), (False, 45))
+}
+_LATENCY_METRICS = {
+    issue: {
+        "p50_ms": base,
+        "p95_ms": base * 2.5,
+        "p99_ms": base * 4,
+        "average_ms": base * 1.2,
+        "status": "critical" if issue else "healthy"
+    }
+    for issue, base in ((True, 850), (False, 45))
 }
 
 
@@ -297,56 +348,44 @@ def _generate_metrics(resource_name: str, metric_type: str, time_range: str) ->
     has_latency_issue = resource_name == "sql-db-main"
     has_error_spike = resource_name == "api-gateway"
     
-    now = datetime.utcnow()
-    
+    now = datetime.now(timezone.utc)
+    data = {}
     metrics = {
         "resource": resource_name,
         "time_range": time_range,
         "collected_at": now.isoformat(),
-        "data": {}
+        "data": data
     }
+    everything = metric_type == "all"
     
-    if metric_type in ["cpu", "all"]:
+    if everything or metric_type == "cpu":
         base_cpu = 85 if has_cpu_issue else 35
-        metrics["data"]["cpu"] = {
-            "current_percent": base_cpu + random.randint(-5, 10),
-            "average_percent": base_cpu - 5,
-            "max_percent": base_cpu + 15,
-            "min_percent": base_cpu - 20,
-            "status": "critical" if has_cpu_issue else "healthy"
+        data["cpu"] = {
+            "current_percent": base_cpu + _randint(-5, 10),
+            **_CPU_METRICS[has_cpu_issue]
         }
     
-    if metric_type in ["memory", "all"]:
+    if everything or metric_type == "memory":
         base_mem = 70 if has_cpu_issue else 45
-        metrics["data"]["memory"] = {
-            "current_percent": base_mem + random.randint(-5, 10),
-            "average_percent": base_mem - 3,
-            "used_gb": round(base_mem * 0.04, 2),
-            "available_gb": round((100 - base_mem) * 0.04, 2),
-            "status": "warning" if has_cpu_issue else "healthy"
+        data["memory"] = {
+            "current_percent": base_mem + _randint(-5, 10),
+            **_MEMORY_METRICS[has_cpu_issue]
         }
     
-    if metric_type in ["latency", "all"]:
-        base_latency = 850 if has_latency_issue else 45
-        metrics["data"]["latency"] = {
-            "p50_ms": base_latency,
-            "p95_ms": base_latency * 2.5,
-            "p99_ms": base_latency * 4,
-            "average_ms": base_latency * 1.2,
-            "status": "critical" if has_latency_issue else "healthy"
-        }
+    if everything or metric_type == "latency":
+        data["latency"] = _LATENCY_METRICS[has_latency_issue].copy()
     
-    if metric_type in ["requests", "all"]:
-        metrics["data"]["requests"] = {
-            "total": random.randint(50000, 150000),
-            "successful": random.randint(45000, 145000),
-            "failed": random.randint(100, 2000) if has_error_spike else random.randint(10, 100),
-            "rate_per_second": random.randint(50, 200)
+    if everything or metric_type == "requests":
+        data["requests"] = {
+            "total": _randint(50000, 150000),
+            "successful": _randint(45000, 145000),
+            "failed": _randint(100, 2000) if has_error_spike else _randint(10, 100),
+            "rate_per_second": _randint(50, 200)
         }
     
-    if metric_type in ["errors", "all"]:
-        error_count = random.randint(500, 2000) if has_error_spike else random.randint(5, 50)
-        metrics["data"]["errors"] = {
+    if everything or metric_type == "errors":
+        error_count = _randint(500, 2000) if has_error_spike else _randint(5, 50)
+        data["errors"] = {
             "total": error_count,
             "rate_percent": round(error_count / 1000 * 100, 2),
             "by_type": {
@@ -361,139 +400,234 @@ def _generate_metrics(resource_name: str, metric_type: str, time_range: str) ->
     return metrics
 
 
-def _generate_logs(resource_name: str, severity: str, limit: int) -> List[Dict[str, Any]]:
-    """Generate realistic log entries."""
-    
-    now = datetime.utcnow()
-    logs = []
-    
-    # Templates for different log types
-    error_templates = [
+class LogTemplate(NamedTuple):
+    """A log entry template; entries copy these fields as-is."""
+    message: str
+    severity: str
+    source: str
+
+
+# Log templates by severity, built once at import
+_LOG_TEMPLATES = {
+    "error": tuple(LogTemplate(t, "error", r) for t, r in [
         ("Connection to database timed out after 30s", "sql-db-main"),
         ("Redis connection pool exhausted, waiting for available connection", "redis-cache-prod"),
         ("Request failed with status 503: Service Unavailable", "api-gateway"),
         ("Out of memory: Container killed by OOM killer", "web-app-prod"),
         ("SSL certificate validation failed for upstream", "api-gateway"),
         ("Rate limit exceeded for client IP 203.0.113.42", "api-gateway"),
-    ]
-    
-    warning_templates = [
+    ]),
+    "warning": tuple(LogTemplate(t, "warning", r) for t, r in [
         ("High CPU utilization detected (>80%)", "web-app-prod"),
         ("Query execution time exceeded threshold (>5s)", "sql-db-main"),
         ("Cache miss rate above normal (>30%)", "redis-cache-prod"),
         ("Slow response detected from downstream service", "web-app-prod"),
         ("Certificate expires in 14 days", "api-gateway"),
         ("Storage account approaching 80% capacity", "storage-prod"),
-    ]
-    
-    info_templates = [
+    ]),
+    "info": tuple(LogTemplate(t, "info", r) for t, r in [
         ("Successfully scaled to 4 replicas", "web-app-prod"),
         ("Deployment completed: v2.3.1", "web-app-prod"),
         ("Database backup completed successfully", "sql-db-main"),
         ("Health check passed", "web-app-prod"),
         ("Configuration reloaded", "api-gateway"),
-    ]
+    ]),
+}
+_LOG_TEMPLATES["all"] = _LOG_TEMPLATES["error"] + _LOG_TEMPLATES["warning"] + _LOG_TEMPLATES["info"]
+
+
+def _templates_for(resource_name: str) -> Dict[str, Tuple[LogTemplate, ...]]:
+    """Templates by severity for one resource; web-app-prod logs are always included."""
+    return {
+        severity: tuple(t for t in templates if t.source == resource_name or t.source == "web-app-prod")
+        for severity, templates in _LOG_TEMPLATES.items()
+    }
+
+
+_LOG_TEMPLATES_BY_RESOURCE = {
+    resource_name: _templates_for(resource_name)
+    for resource_name in {t.source for t in _LOG_TEMPLATES["all"]} | MOCK_RESOURCES.keys()
+}
+# Any other resource only matches the web-app-prod templates
+_LOG_TEMPLATES_OTHER = _templates_for("web-app-prod")
+
+
+def _generate_logs(resource_name: str, severity: str, limit: int) -> List[Dict[str, Any]]:
+    """Generate realistic log entries."""
     
-    # Generate logs based on severity filter
-    templates_to_use = []
-    if severity in ["all", "error"]:
-        templates_to_use.extend([(t, "error", r) for t, r in error_templates])
-    if severity in ["all", "warning"]:
-        templates_to_use.extend([(t, "warning", r) for t, r in warning_templates])
-    if severity in ["all", "info"]:
-        templates_to_use.extend([(t, "info", r) for t, r in info_templates])
+    # Offsets are whole minutes, so every entry shares now's seconds and
+    # microseconds; those are formatted once and only the minute per entry
+    now = datetime.now(timezone.utc)
+    base = calendar.timegm(now.timetuple())
+    suffix = now.isoformat()[16:]
     
-    # Filter by resource if specific resource requested
-    if resource_name != "all":
-        templates_to_use = [t for t in templates_to_use if t[2] == resource_name or t[2] == "web-app-prod"]
+    # Pick the templates for the severity filter, narrowed to the resource
+    # if a specific resource was requested
+    if resource_name == "all":
+        templates_by_severity = _LOG_TEMPLATES
+    else:
+        templates_by_severity = _LOG_TEMPLATES_BY_RESOURCE.get(resource_name, _LOG_TEMPLATES_OTHER)
+    templates_to_use = templates_by_severity.get(severity, ())
     
-    # Generate log entries
-    for i in range(min(limit, len(templates_to_use) * 3)):
-        template = random.choice(templates_to_use) if templates_to_use else ("No logs available", "info", resource_name)
-        timestamp = now - timedelta(minutes=random.randint(1, 360))
-        
-        logs.append({
-            "timestamp": timestamp.isoformat(),
-            "severity": template[1],
-            "message": template[0],
-            "source": template[2],
-            "correlation_id": f"corr-{random.randint(10000, 99999)}"
-        })
+    # Draw all templates, offsets and ids in one call each. Sorting the
+    # minute offsets ascending yields entries most recent first. Templates
+    # are unpacked as plain tuples below, which beats attribute access.
+    count = min(limit, len(templates_to_use) * 3)
+    picks = _choices(templates_to_use, k=count)
+    offsets = sorted(_choices(range(1, 361), k=count))
+    correlation_ids = _choices(range(10000, 100000), k=count)
     
-    # Sort by timestamp descending
-    logs.sort(key=lambda x: x["timestamp"], reverse=True)
-    return logs[:limit]
+    return [
+        {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M", time.gmtime(base - minutes * 60)) + suffix,
+            "severity": log_severity,
+            "message": message,
+            "source": source,
+            "correlation_id": f"corr-{correlation_id}"
+        }
+        for (message, log_severity, source), minutes, correlation_id in zip(picks, offsets, correlation_ids)
+    ]
+
+
+# Change history templates, in the order entries are generated
+_CHANGE_TEMPLATES = (
+    {
+        "type": "deployment",
+        "description": "Deployed new version v2.3.1",
+        "user": "deploy-pipeline@contoso.com",
+        "details": {"old_version": "v2.3.0", "new_version": "v2.3.1", "replicas": 4}
+    },
+    {
+        "type": "configuration",
+        "description": "Updated environment variable DATABASE_TIMEOUT",
+        "user": "john.smith@contoso.com",
+        "details": {"setting": "DATABASE_TIMEOUT", "old_value": "30", "new_value": "60"}
+    },
+    {
+        "type": "scaling",
+        "description": "Auto-scaled from 2 to 4 replicas",
+        "user": "system",
+        "details": {"trigger": "cpu_threshold", "old_replicas": 2, "new_replicas": 4}
+    },
+    {
+        "type": "configuration",
+        "description": "Increased max connections pool size",
+        "user": "jane.doe@contoso.com",
+        "details": {"setting": "MAX_POOL_SIZE", "old_value": "100", "new_value": "200"}
+    },
+    {
+        "type": "security",
+        "description": "Rotated managed identity credentials",
+        "user": "security-automation@contoso.com",
+        "details": {"credential_type": "managed_identity"}
+    },
+)
 
 
 def _generate_changes(resource_name: str, days: int) -> List[Dict[str, Any]]:
     """Generate recent change history."""
     
-    now = datetime.utcnow()
-    changes = []
+    # As in _generate_logs, only the hour varies below the day, so the
+    # minutes onwards are formatted once
+    now = datetime.now(timezone.utc)
+    base = calendar.timegm(now.timetuple())
+    suffix = now.isoformat()[13:]
     
-    change_templates = [
-        {
-            "type": "deployment",
-            "description": "Deployed new version v2.3.1",
-            "user": "deploy-pipeline@contoso.com",
-            "details": {"old_version": "v2.3.0", "new_version": "v2.3.1", "replicas": 4}
-        },
-        {
-            "type": "configuration",
-            "description": "Updated environment variable DATABASE_TIMEOUT",
-            "user": "john.smith@contoso.com",
-            "details": {"setting": "DATABASE_TIMEOUT", "old_value": "30", "new_value": "60"}
-        },
+    # Spread changes over the time period. Entries are sorted most recent
+    # first on their integer age, and only then formatted.
+    aged = sorted(
+        ((_randint(0, days) * 86400 + _randint(0, 23) * 3600, template)
+         for template in _CHANGE_TEMPLATES[:max(days, 0)]),
+        key=lambda pair: pair[0]
+    )
+    return [
         {
-            "type": "scaling",
-            "description": "Auto-scaled from 2 to 4 replicas",
-            "user": "system",
-            "details": {"trigger": "cpu_threshold", "old_replicas": 2, "new_replicas": 4}
-        },
-        {
-            "type": "configuration",
-            "description": "Increased max connections pool size",
-            "user": "jane.doe@contoso.com", 
-            "details": {"setting": "MAX_POOL_SIZE", "old_value": "100", "new_value": "200"}
-        },
-        {
-            "type": "security",
-            "description": "Rotated managed identity credentials",
-            "user": "security-automation@contoso.com",
-            "details": {"credential_type": "managed_identity"}
-        },
-    ]
-    
-    # Generate changes spread over the time period
-    for i in range(min(days, len(change_templates))):
-        template = change_templates[i]
-        timestamp = now - timedelta(days=random.randint(0, days), hours=random.randint(0, 23))
-        
-        changes.append({
-            "timestamp": timestamp.isoformat(),
+            "timestamp": time.strftime("%Y-%m-%dT%H", time.gmtime(base - seconds_ago)) + suffix,
             "resource": resource_name,
             **template
-        })
-    
-    changes.sort(key=lambda x: x["timestamp"], reverse=True)
-    return changes
+        }
+        for seconds_ago, template in aged
+    ]
 
 
 # ============ Tool Implementation Functions ============
 
+# Relative timestamps used by the mock payloads, refreshed at most once per
+# TIMESTAMP_TTL seconds so calls in the same tick share the formatted strings
+TIMESTAMP_TTL = 1.0
+_timestamp_cache = {"expires": 0.0, "values": None}
+
+
+def _iso_timestamps() -> Dict[str, str]:
+    """ISO timestamps for 2 hours, 30 minutes and 180 days ago."""
+    if time.monotonic() >= _timestamp_cache["expires"]:
+        now = datetime.now(timezone.utc)
+        _timestamp_cache["values"] = {
+            "2h_ago": (now - timedelta(hours=2)).isoformat(),
+            "30m_ago": (now - timedelta(minutes=30)).isoformat(),
+            "180d_ago": (now - timedelta(days=180)).isoformat(),
+        }
+        _timestamp_cache["expires"] = time.monotonic() + TIMESTAMP_TTL
+    return _timestamp_cache["values"]
+
+
+# MOCK_RESOURCES never changes at runtime, so the known-resource payloads of
+# get_system_config, check_dependencies and get_resource_details are built
+# once here. Tools return shallow copies.
+_CONFIG_PAYLOADS = {
+    name: {
+        "resource_name": name,
+        "resource_type": resource["type"],
+        "region": resource["region"],
+        "resource_group": resource["resource_group"],
+        "configuration": resource["config"],
+        "tags": resource["tags"]
+    }
+    for name, resource in MOCK_RESOURCES.items()
+}
+
+_DEPENDENCY_PAYLOADS = {
+    name: {
+        "resource": name,
+        "upstream_dependencies": resource["dependencies"]["upstream"],
+        "downstream_dependencies": resource["dependencies"]["downstream"],
+        "upstream_count": len(resource["dependencies"]["upstream"]),
+        "downstream_count": len(resource["dependencies"]["downstream"])
+    }
+    for name, resource in MOCK_RESOURCES.items()
+}
+
+# (details without timestamps, resource id); timestamps are added per call
+_DETAILS_PAYLOADS = {
+    name: (
+        {
+            "resource_name": name,
+            "resource_type": resource["type"],
+            "resource_group": resource["resource_group"],
+            "subscription": resource["subscription"],
+            "region": resource["region"],
+            "tags": resource["tags"],
+            "provisioning_state": "Succeeded"
+        },
+        f"/subscriptions/{resource['subscription']}/resourceGroups/{resource['resource_group']}/providers/Microsoft.App/containerApps/{name}"
+    )
+    for name, resource in MOCK_RESOURCES.items()
+}
+
+
+# Fallback payload for resources missing from MOCK_RESOURCES, completed per
+# call with the requested name; its values are strings, so it can be shared
+_UNKNOWN_DETAILS = {
+    "error": "Resource not found in inventory",
+    "suggestion": "Check resource name spelling or verify the resource exists"
+}
+
+
 def get_system_config(resource_name: str, resource_type: str) -> Dict[str, Any]:
     """Get configuration details for an Azure resource."""
     
-    if resource_name in MOCK_RESOURCES:
-        resource = MOCK_RESOURCES[resource_name]
-        return {
-            "resource_name": resource_name,
-            "resource_type": resource["type"],
-            "region": resource["region"],
-            "resource_group": resource["resource_group"],
-            "configuration": resource["config"],
-            "tags": resource["tags"]
-        }
+    if resource_name in _CONFIG_PAYLOADS:
+        return _CONFIG_PAYLOADS[resource_name].copy()
     
     # Return generic config for unknown resources
     return {
@@ -526,31 +660,43 @@ def get_recent_logs(resource_name: str, severity: str = "all", limit: int = 20)
     }
 
 
+def _sql_eastus_incidents(timestamps: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Active incidents for the simulated Azure SQL outage in eastus."""
+    return [
+        {
+            "incident_id": "SQL-2024-0215",
+            "title": "Intermittent connectivity issues",
+            "status": "investigating",
+            "start_time": timestamps["2h_ago"],
+            "description": "Some customers may experience intermittent connection timeouts to Azure SQL databases in East US region.",
+            "impacted_services": ["Azure SQL Database", "SQL Managed Instance"],
+            "updates": [
+                {
+                    "time": timestamps["30m_ago"],
+                    "message": "Engineering team has identified the root cause and is implementing a fix."
+                }
+            ]
+        }
+    ]
+
+
+# Simulated service issues: (service, region) -> builder of the active
+# incidents, given the shared relative timestamps
+_SERVICE_INCIDENTS = {
+    ("Azure SQL", "eastus"): _sql_eastus_incidents,
+}
+
+
 def get_service_health(service: str, region: str = "eastus") -> Dict[str, Any]:
     """Check Azure service health for known issues."""
     
-    # Simulate a service issue for SQL in eastus
-    if service == "Azure SQL" and region == "eastus":
+    incidents = _SERVICE_INCIDENTS.get((service, region))
+    if incidents is not None:
         return {
             "service": service,
             "region": region,
             "status": "degraded",
-            "active_incidents": [
-                {
-                    "incident_id": "SQL-2024-0215",
-                    "title": "Intermittent connectivity issues",
-                    "status": "investigating",
-                    "start_time": (datetime.utcnow() - timedelta(hours=2)).isoformat(),
-                    "description": "Some customers may experience intermittent connection timeouts to Azure SQL databases in East US region.",
-                    "impacted_services": ["Azure SQL Database", "SQL Managed Instance"],
-                    "updates": [
-                        {
-                            "time": (datetime.utcnow() - timedelta(minutes=30)).isoformat(),
-                            "message": "Engineering team has identified the root cause and is implementing a fix."
-                        }
-                    ]
-                }
-            ]
+            "active_incidents": incidents(_iso_timestamps())
         }
     
     return {
@@ -576,15 +722,8 @@ def get_recent_changes(resource_name: str, days: int = 7) -> Dict[str, Any]:
 def check_dependencies(resource_name: str) -> Dict[str, Any]:
     """List dependencies of a resource."""
     
-    if resource_name in MOCK_RESOURCES:
-        deps = MOCK_RESOURCES[resource_name]["dependencies"]
-        return {
-            "resource": resource_name,
-            "upstream_dependencies": deps["upstream"],
-            "downstream_dependencies": deps["downstream"],
-            "upstream_count": len(deps["upstream"]),
-            "downstream_count": len(deps["downstream"])
-        }
+    if resource_name in _DEPENDENCY_PAYLOADS:
+        return _DEPENDENCY_PAYLOADS[resource_name].copy()
     
     return {
         "resource": resource_name,
@@ -597,23 +736,33 @@ def check_dependencies(resource_name: str) -> Dict[str, Any]:
 def get_resource_details(resource_name: str) -> Dict[str, Any]:
     """Get comprehensive details about an Azure resource."""
     
-    if resource_name in MOCK_RESOURCES:
-        resource = MOCK_RESOURCES[resource_name]
+    if resource_name in _DETAILS_PAYLOADS:
+        details, resource_id = _DETAILS_PAYLOADS[resource_name]
+        timestamps = _iso_timestamps()
         return {
-            "resource_name": resource_name,
-            "resource_type": resource["type"],
-            "resource_group": resource["resource_group"],
-            "subscription": resource["subscription"],
-            "region": resource["region"],
-            "tags": resource["tags"],
-            "provisioning_state": "Succeeded",
-            "created_at": (datetime.utcnow() - timedelta(days=180)).isoformat(),
-            "last_modified": (datetime.utcnow() - timedelta(hours=2)).isoformat(),
-            "resource_id": f"/subscriptions/{resource['subscription']}/resourceGroups/{resource['resource_group']}/providers/Microsoft.App/containerApps/{resource_name}"
+            **details,
+            "created_at": timestamps["180d_ago"],
+            "last_modified": timestamps["2h_ago"],
+            "resource_id": resource_id
         }
     
-    return {
-        "resource_name": resource_name,
-        "error": "Resource not found in inventory",
-        "suggestion": "Check resource name spelling or verify the resource exists"
-    }
+    return {"resource_name": resource_name, **_UNKNOWN_DETAILS}
+
+
+# ============ Tool Dispatch ============
+
+# Tool name to implementation, for dispatching model-requested tool calls
+TOOL_FUNCTIONS = {
+    "get_system_config": get_system_config,
+    "get_system_metrics": get_system_metrics,
+    "get_recent_logs": get_recent_logs,
+    "get_service_health": get_service_health,
+    "get_recent_changes": get_recent_changes,
+    "check_dependencies": check_dependencies,
+    "get_resource_details": get_resource_details,
+}
+
+
+def dispatch_many(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Run a batch of (tool_name, arguments) calls in order and return their results."""
+    return [TOOL_FUNCTIONS[name](**arguments) for name, arguments in calls]